@@ -23,13 +23,25 @@ import os
 import sys
 import time
 import hashlib
+import shutil
+import signal
+import atexit
+import queue
 from datetime import datetime
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from logging.handlers import QueueHandler, QueueListener
+
+# Configure logging: records are queued and written by a background
+# listener thread, so Socket.IO and app output threads never block on I/O
+_log_queue = queue.Queue(-1)
+_log_output = logging.StreamHandler()
+_log_output.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_listener = QueueListener(_log_queue, _log_output)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+_log_enqueue = QueueHandler(_log_queue)
+_log_enqueue.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[_log_enqueue])
 logger = logging.getLogger(__name__)
 
 class UniversalDeploymentAgent:
@@ -46,6 +58,7 @@ class UniversalDeploymentAgent:
         self.mqtt_port = mqtt_port
         self.auto_start_mqtt = auto_start_mqtt
         self.mqtt_process = None
+        self._capabilities = None  # detected on first connect
 
         # Ensure directories exist
         os.makedirs(self.deployment_dir, exist_ok=True)
@@ -58,6 +71,31 @@ class UniversalDeploymentAgent:
         # Track active requests for stdout streaming
         self.active_requests = {}  # {request_id: {app_name, cmd, request_from}}
 
+        # Base environments for deployed apps, built once; each deployment
+        # only layers its own UDA_APP_NAME on top
+        kuksa_address = os.environ.get('KUKSA_DATA_BROKER_ADDRESS', 'localhost:55555')
+        self._sdv_deploy_env = {
+            **os.environ,
+            'KUKSA_DATA_BROKER_ADDRESS': kuksa_address,
+            'UDA_AGENT_ID': self.device_id,
+            # MQTT broker configuration (use configured settings)
+            'MQTT_BROKER_HOST': self.mqtt_host,
+            'MQTT_BROKER_PORT': str(self.mqtt_port),
+            'VEHICLERUNTIME_MQTT_BROKER_HOST': self.mqtt_host,
+            'VEHICLERUNTIME_MQTT_BROKER_PORT': str(self.mqtt_port),
+            # Mock Dapr settings to avoid connection attempts
+            'DAPR_HTTP_PORT': '3500',
+            'DAPR_GRPC_PORT': '50001'
+        }
+        self._python_app_env = {
+            **os.environ,
+            'KUKSA_DATA_BROKER_ADDRESS': kuksa_address,
+            'VEHICLE_APP_SDK_CONFIG_PATH': os.environ.get('VEHICLE_APP_SDK_CONFIG_PATH', '/app/vehicle-app-sdk-config.json'),
+            'SDV_MODE': os.environ.get('SDV_MODE', 'standard'),
+            'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'INFO'),
+            'UDA_AGENT_ID': self.device_id
+        }
+
         logger.info(f"🚀 Initializing UDA Agent")
         logger.info(f"🏷️  Runtime Name: {self.runtime_name}")
         logger.info(f"🆔 Kit ID: {self.device_id}")
@@ -73,12 +111,9 @@ class UniversalDeploymentAgent:
         # Setup Socket.IO event handlers
         self.setup_events()
 
-    def setup_events(self):
-        """Setup Socket.IO event handlers"""
-
-        @self.sio.event
-        def connect():
-            logger.info(f"✅ Connected to Kit Server Adapter")
+    def _get_capabilities(self):
+        """Detect kit capabilities once; reconnects reuse the cached list"""
+        if self._capabilities is None:
             capabilities = ['python', 'velocitas-sdk', 'kuksa-databroker']
 
             # Add Docker capability if available
@@ -89,6 +124,17 @@ class UniversalDeploymentAgent:
             except ImportError:
                 logger.info("ℹ️ Docker not available")
 
+            self._capabilities = capabilities
+        return self._capabilities
+
+    def setup_events(self):
+        """Setup Socket.IO event handlers"""
+
+        @self.sio.event
+        def connect():
+            logger.info(f"✅ Connected to Kit Server Adapter")
+            capabilities = self._get_capabilities()
+
             self.sio.emit('register_kit', {
                 'kit_id': self.device_id,
                 'name': self.runtime_name,
@@ -113,7 +159,16 @@ class UniversalDeploymentAgent:
             logger.info(f"✅ Runtime registration acknowledged by Kit Server")
             logger.info(f"📋 Runtime '{self.runtime_name}' is now online and discoverable")
 
-        # SDV Runtime Compatible Event Handlers
+        # SDV Runtime Compatible Event Handlers, dispatched by command name
+        sdv_handlers = {
+            'deploy_request': self._handle_sdv_deploy,
+            'deploy_n_run': self._handle_sdv_deploy,
+            'run_python_app': self._handle_sdv_deploy,
+            'stop_python_app': self._handle_sdv_stop,
+            'get-runtime-info': self._handle_sdv_status,
+            'subscribe_apis': self._handle_sdv_subscribe_apis,
+        }
+
         @self.sio.event
         def messageToKit(data):
             """Handle SDV runtime compatible messages"""
@@ -121,16 +176,11 @@ class UniversalDeploymentAgent:
                 cmd = data.get('cmd', '')
                 request_from = data.get('request_from', 'unknown')
 
-                logger.info(f"📨 SDV Runtime Command: {cmd}")
+                logger.info("📨 SDV Runtime Command: %s", cmd)
 
-                if cmd in ['deploy_request', 'deploy_n_run', 'run_python_app']:
-                    self._handle_sdv_deploy(data, request_from)
-                elif cmd == 'stop_python_app':
-                    self._handle_sdv_stop(data, request_from)
-                elif cmd == 'get-runtime-info':
-                    self._handle_sdv_status(data, request_from)
-                elif cmd == 'subscribe_apis':
-                    self._handle_sdv_subscribe_apis(data, request_from)
+                handler = sdv_handlers.get(cmd)
+                if handler is not None:
+                    handler(data, request_from)
                 else:
                     logger.warning(f"⚠️ Unknown SDV command: {cmd}")
                     self._send_sdv_response(request_from, cmd, "Unknown command", False, 1)
@@ -144,9 +194,9 @@ class UniversalDeploymentAgent:
         # Catch-all event listener for debugging (must be last)
         @self.sio.on('*')
         def catch_all(event, data):
-            logger.info(f"📨 Kit Server Event: {event}")
+            logger.info("📨 Kit Server Event: %s", event)
             if data:
-                logger.debug(f"📦 Data: {data}")
+                logger.debug("📦 Data: %s", data)
 
     def _setup_sdv_compatibility(self):
         """Setup SDV compatibility layer using symlink approach (same as SDV runtime)"""
@@ -253,9 +303,7 @@ class UniversalDeploymentAgent:
 
         try:
             # Check if mosquitto is available
-            import subprocess
-            result = subprocess.run(['which', 'mosquitto'], capture_output=True, text=True)
-            if result.returncode != 0:
+            if shutil.which('mosquitto') is None:
                 logger.warning("⚠️ mosquitto not found - cannot auto-start MQTT broker")
                 self._test_mqtt_connection()
                 return
@@ -352,7 +400,7 @@ allow_anonymous true
         if token:
             message['token'] = token
 
-        logger.info(f"📤 Sending Kit Server reply: {cmd} -> {result[:100]}{'...' if len(result) > 100 else ''}")
+        logger.info("📤 Sending Kit Server reply: %s -> %.100s%s", cmd, result, '...' if len(result) > 100 else '')
         print(f"🐛 DEBUG: About to emit messageToKit-kitReply event")
         self.sio.emit('messageToKit-kitReply', message)
         print(f"🐛 DEBUG: messageToKit-kitReply event emitted successfully")
@@ -381,7 +429,7 @@ allow_anonymous true
             'data': state_data
         }
 
-        logger.info(f"📊 Sending runtime state: {len(self.running_apps)} running apps")
+        logger.info("📊 Sending runtime state: %d running apps", len(self.running_apps))
         self.sio.emit('report-runtime-state', message)
 
     def stream_app_output(self, request_from, app_name, process, cmd='run_python_app'):
@@ -428,7 +476,7 @@ allow_anonymous true
                         self.send_app_output(request_from, app_name, formatted_line, cmd)
 
                         # Also log locally
-                        logger.info(f"📋 {formatted_line}")
+                        logger.info("📋 %s", formatted_line)
 
                 except queue.Empty:
                     continue
@@ -571,20 +619,7 @@ allow_anonymous true
             log_file = os.path.join(self.log_dir, f"{app_name}.log")
 
             # Set up environment variables
-            env = os.environ.copy()
-            env.update({
-                'KUKSA_DATA_BROKER_ADDRESS': os.environ.get('KUKSA_DATA_BROKER_ADDRESS', 'localhost:55555'),
-                'UDA_APP_NAME': app_name,
-                'UDA_AGENT_ID': self.device_id,
-                # MQTT broker configuration (use configured settings)
-                'MQTT_BROKER_HOST': self.mqtt_host,
-                'MQTT_BROKER_PORT': str(self.mqtt_port),
-                'VEHICLERUNTIME_MQTT_BROKER_HOST': self.mqtt_host,
-                'VEHICLERUNTIME_MQTT_BROKER_PORT': str(self.mqtt_port),
-                # Mock Dapr settings to avoid connection attempts
-                'DAPR_HTTP_PORT': '3500',
-                'DAPR_GRPC_PORT': '50001'
-            })
+            env = {**self._sdv_deploy_env, 'UDA_APP_NAME': app_name}
 
             # Execute with python -u for unbuffered output
             process = subprocess.Popen(
@@ -721,7 +756,7 @@ allow_anonymous true
         """Send SDV runtime compatible response"""
         print(f"🐛 DEBUG: _send_sdv_response called - about to call send_kit_server_reply")
         self.send_kit_server_reply(request_from, cmd, result, is_done=True, code=return_code)
-        logger.info(f"📤 SDV Response sent: {cmd} -> {result}")
+        logger.info("📤 SDV Response sent: %s -> %s", cmd, result)
 
     def _get_or_generate_runtime_name(self):
         """Load existing runtime name from file or generate new one"""
@@ -771,18 +806,16 @@ allow_anonymous true
                 f.write(code)
 
             # Set up environment variables for SDV apps
-            env = os.environ.copy()
-            env.update({
-                'KUKSA_DATA_BROKER_ADDRESS': os.environ.get('KUKSA_DATA_BROKER_ADDRESS', 'localhost:55555'),
-                'VEHICLE_APP_SDK_CONFIG_PATH': os.environ.get('VEHICLE_APP_SDK_CONFIG_PATH', '/app/vehicle-app-sdk-config.json'),
-                'SDV_MODE': os.environ.get('SDV_MODE', 'standard'),
-                'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'INFO'),
-                'UDA_APP_NAME': app_name,
-                'UDA_AGENT_ID': self.device_id
-            })
+            env = {**self._python_app_env, 'UDA_APP_NAME': app_name}
+
+            # Open the log before spawning, so a failed open() doesn't leave a
+            # child behind with nobody reading its pipe. The capture thread
+            # owns the file and closes it when the app exits; line buffering
+            # keeps the log current for tailing
+            log_fh = open(log_file, 'w', buffering=1)
 
             # Execute app in background with proper logging
-            with open(log_file, 'w') as log_fh:
+            try:
                 process = subprocess.Popen(
                     [sys.executable, app_file],
                     stdout=subprocess.PIPE,
@@ -791,18 +824,21 @@ allow_anonymous true
                     env=env,
                     universal_newlines=True
                 )
-
-                # Start a thread to capture output
-                import threading
-                def capture_output():
+            except Exception:
+                log_fh.close()
+                raise
+
+            # Start a thread to capture output
+            import threading
+            def capture_output():
+                with log_fh:
                     for line in iter(process.stdout.readline, ''):
                         if line:
                             log_fh.write(line)
-                            log_fh.flush()
-                            logger.info(f"📋 [{app_name}] {line.strip()}")
+                            logger.info("📋 [%s] %s", app_name, line.strip())
 
-                output_thread = threading.Thread(target=capture_output, daemon=True)
-                output_thread.start()
+            output_thread = threading.Thread(target=capture_output, daemon=True)
+            output_thread.start()
 
             # Track running app
             self.running_apps[app_name] = {
@@ -834,6 +870,13 @@ allow_anonymous true
     def start(self):
         """Start the UDA agent"""
         try:
+            # Treat SIGTERM like Ctrl-C so the graceful shutdown below runs
+            # and stops deployed apps. Installed here rather than in main(),
+            # so a SIGTERM during __init__ can't raise outside this try. The
+            # handler raises on the main thread, where sio.wait() is blocked,
+            # not on a Socket.IO worker thread
+            signal.signal(signal.SIGTERM, signal.default_int_handler)
+
             logger.info(f"🚀 Starting UDA Agent (ID: {self.device_id})")
             logger.info(f"📡 Connecting to Kit Server Adapter: {self.kit_server_url}")
 
@@ -855,15 +898,20 @@ allow_anonymous true
         """Gracefully shutdown the agent and all apps"""
         logger.info("🛑 Shutting down UDA Agent...")
 
-        # Stop all running apps
+        # Ask all running apps to stop first, so they shut down in parallel
         for app_name, app_info in self.running_apps.items():
             try:
-                process = app_info['process']
-                process.terminate()
+                app_info['process'].terminate()
+            except Exception as e:
+                logger.error(f"❌ Error stopping app {app_name}: {e}")
 
-                # Wait for graceful shutdown
+        # Wait for graceful shutdown against one shared 5 second deadline
+        deadline = time.monotonic() + 5
+        for app_name, app_info in self.running_apps.items():
+            try:
+                process = app_info['process']
                 try:
-                    process.wait(timeout=5)
+                    process.wait(timeout=max(0, deadline - time.monotonic()))
                 except subprocess.TimeoutExpired:
                     process.kill()
 
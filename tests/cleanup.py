@@ -5,29 +5,28 @@ Ensures clean environment before running UDA agent tests
 """
 
 import subprocess
-import time
 import psutil
 import sys
 import os
 
 def kill_processes_by_name(pattern):
-    """Kill processes matching the given pattern"""
-    killed = 0
+    """Kill processes matching the given pattern; returns the killed processes"""
+    killed = []
     for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
         try:
             cmdline = ' '.join(proc.info['cmdline'] or [])
             if pattern in cmdline:
                 print(f"🔪 Killing process {proc.info['pid']}: {proc.info['name']} ({cmdline[:80]}{'...' if len(cmdline) > 80 else ''})")
                 proc.kill()
-                killed += 1
+                killed.append(proc)
         except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
             pass
     return killed
 
 def check_and_kill_ports():
-    """Kill processes using common test ports"""
+    """Kill processes using common test ports; returns the killed processes"""
     ports = [3090, 3091, 8080, 5000]  # Common test ports
-    killed = 0
+    killed = []
 
     for port in ports:
         try:
@@ -37,7 +36,7 @@ def check_and_kill_ports():
                         if conn.laddr.port == port:
                             print(f"🔪 Killing process {proc.info['pid']} using port {port}: {proc.info['name']}")
                             proc.kill()
-                            killed += 1
+                            killed.append(proc)
                             break
                 except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
                     pass
@@ -76,14 +75,14 @@ def clean_temp_files():
 
     return cleaned
 
-def wait_for_processes_to_die(timeout=10):
-    """Wait for processes to fully terminate"""
-    print(f"⏳ Waiting for processes to terminate...")
-    for i in range(timeout):
-        time.sleep(1)
-        sys.stdout.write(f"   {i+1}/{timeout}\r")
-        sys.stdout.flush()
-    print()
+def wait_for_processes_to_die(procs, timeout=10):
+    """Wait for the killed processes to fully terminate, up to `timeout` seconds"""
+    print(f"⏳ Waiting for {len(procs)} processes to terminate...")
+    # Returns as soon as every process is gone instead of always sleeping
+    # for the full timeout
+    _, alive = psutil.wait_procs(procs, timeout=timeout)
+    for proc in alive:
+        print(f"⚠️  Process {proc.pid} still running after {timeout}s")
 
 def verify_clean_environment():
     """Verify that the environment is clean"""
@@ -122,18 +121,18 @@ def main():
     process_killed = kill_processes_by_name('mock_kit_server.py')
     process_killed += kill_processes_by_name('uda_agent.py')
     process_killed += kill_processes_by_name('python.*test')
-    print(f"   ✅ Killed {process_killed} processes")
+    print(f"   ✅ Killed {len(process_killed)} processes")
 
     print("\n2️⃣ Killing processes using test ports...")
     port_killed = check_and_kill_ports()
-    print(f"   ✅ Killed {port_killed} processes on test ports")
+    print(f"   ✅ Killed {len(port_killed)} processes on test ports")
 
     print("\n3️⃣ Cleaning temporary files...")
     files_cleaned = clean_temp_files()
     print(f"   ✅ Cleaned {files_cleaned} temporary files")
 
     print("\n4️⃣ Waiting for processes to fully terminate...")
-    wait_for_processes_to_die()
+    wait_for_processes_to_die(process_killed + port_killed)
 
     print("\n5️⃣ Verifying clean environment...")
     verify_clean_environment()
@@ -3,40 +3,51 @@
 Test full flow with Mock Kit Server and UDA Agent both running
 """
 
+import asyncio
 import socketio
-import time
 import json
-import subprocess
 import sys
 import os
-import threading
-import atexit
 
-def test_full_flow():
+# Add parent directory to path for test_helpers
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from test_helpers import start_mock_server, start_uda_agent
+
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+async def test_full_flow():
     """Test complete flow: Mock Server -> UDA Agent -> Mock Server -> Test Client"""
 
     # Create Socket.IO client for testing
-    sio = socketio.Client()
+    sio = socketio.AsyncClient()
+    reply_received = asyncio.Event()
 
     @sio.event
-    def connect():
+    async def connect():
         print("✅ Test client connected to Mock Kit Server")
 
     @sio.event
-    def disconnect():
+    async def disconnect():
         print("❌ Test client disconnected")
 
-    @sio.on('*')
-    def catch_all(event, data):
-        print(f"\n📨 EVENT RECEIVED: {event}")
-        if isinstance(data, dict):
+    @sio.on('messageToKit-kitReply')
+    async def on_kit_reply(data):
+        print(f"\n📨 EVENT RECEIVED: messageToKit-kitReply")
+        if os.getenv('UDA_TEST_TRACE'):
             print(f"📦 Data: {json.dumps(data, indent=2)}")
-        else:
-            print(f"📦 Data: {str(data)}")
+        print(f"🎯 SUCCESS: Received messageToKit-kitReply!")
+        reply_received.set()
 
-        if event == 'messageToKit-kitReply':
-            print(f"🎯 SUCCESS: Received messageToKit-kitReply!")
-        elif event == 'messageToKit' and isinstance(data, dict) and 'result' in data:
+    @sio.on('messageToKit')
+    async def on_message_to_kit(data):
+        print(f"\n📨 EVENT RECEIVED: messageToKit")
+        if os.getenv('UDA_TEST_TRACE'):
+            print(f"📦 Data: {json.dumps(data, indent=2)}")
+        if isinstance(data, dict) and 'result' in data:
             print(f"🔄 INFO: Received messageToKit response: {data.get('cmd', 'unknown')}")
 
     try:
@@ -44,20 +55,18 @@ def test_full_flow():
         # Add connection timeout and retry logic for container environments
         for attempt in range(3):
             try:
-                sio.connect('http://localhost:3091', transports=['polling'], socketio_path='socket.io')
+                # Let the client upgrade to websocket: against the aiohttp
+                # server a polling-only client takes ~30s to disconnect
+                await sio.connect('http://localhost:3091')
                 break
             except Exception as e:
                 print(f"⚠️  Connection attempt {attempt + 1} failed: {e}")
                 if attempt < 2:
                     print("🔄 Retrying in 2 seconds...")
-                    time.sleep(2)
+                    await asyncio.sleep(2)
                 else:
                     raise
 
-        # Wait for UDA agent to connect (5 seconds)
-        print("⏳ Waiting for UDA agent to connect...")
-        time.sleep(5)
-
         # Send runtime info request
         message = {
             'cmd': 'get-runtime-info',
@@ -66,88 +75,20 @@ def test_full_flow():
         }
         print(f"\n📤 Sending get-runtime-info request:")
         print(f"   {json.dumps(message, indent=2)}")
-        sio.emit('messageToKit', message)
+        await sio.emit('messageToKit', message)
 
         # Wait for response
-        print("⏳ Waiting for response (10 seconds)...")
-        time.sleep(10)
+        print("⏳ Waiting for response (up to 10 seconds)...")
+        try:
+            await asyncio.wait_for(reply_received.wait(), timeout=10)
+        except asyncio.TimeoutError:
+            print("⏰ No messageToKit-kitReply received within 10 seconds")
 
     except Exception as e:
         print(f"❌ Test error: {e}")
     finally:
         if sio.connected:
-            sio.disconnect()
-
-def start_mock_server():
-    """Start Mock Kit Server with logging"""
-    print("🚀 Starting Mock Kit Server...")
-
-    mock_server_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'tests', 'tools', 'mock_kit_server.py')
-    process = subprocess.Popen([
-        sys.executable, mock_server_path
-    ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-       universal_newlines=True)
-
-    def log_output():
-        for line in iter(process.stdout.readline, ''):
-            print(f"[MOCK] {line.strip()}")
-
-    thread = threading.Thread(target=log_output, daemon=True)
-    thread.start()
-
-    atexit.register(lambda: cleanup_process(process, "Mock Kit Server"))
-
-    time.sleep(3)
-
-    if process.poll() is None:
-        print(f"✅ Mock Kit Server started (PID: {process.pid})")
-        return process
-    else:
-        print("❌ Mock Kit Server failed to start")
-        return None
-
-def start_uda_agent():
-    """Start UDA Agent with logging"""
-    print("🚀 Starting UDA Agent...")
-
-    # Change to parent directory (UDA Agent root)
-    uda_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    uda_agent_path = os.path.join(uda_dir, 'src', 'uda_agent.py')
-    process = subprocess.Popen([
-        sys.executable, uda_agent_path, '--server', 'http://localhost:3091'
-    ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-       universal_newlines=True, cwd=uda_dir)
-
-    def log_output():
-        for line in iter(process.stdout.readline, ''):
-            print(f"[UDA] {line.strip()}")
-
-    thread = threading.Thread(target=log_output, daemon=True)
-    thread.start()
-
-    atexit.register(lambda: cleanup_process(process, "UDA Agent"))
-
-    time.sleep(5)  # Give UDA agent time to connect to Mock Kit Server
-
-    if process.poll() is None:
-        print(f"✅ UDA Agent started (PID: {process.pid})")
-        return process
-    else:
-        print("❌ UDA Agent failed to start")
-        return None
-
-def cleanup_process(process, name):
-    """Clean up background process"""
-    try:
-        if process.poll() is None:
-            print(f"🛑 Stopping {name}...")
-            process.terminate()
-            try:
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                process.kill()
-    except:
-        pass
+            await sio.disconnect()
 
 if __name__ == "__main__":
     print("🧪 Full Flow Test: Mock Kit Server + UDA Agent + Test Client")
@@ -169,7 +110,7 @@ if __name__ == "__main__":
 
         # Run the full flow test
         print("\n🧪 Running full flow test...")
-        test_full_flow()
+        asyncio.run(test_full_flow())
 
         print("\n🏁 Full flow test completed!")
 
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+SDV app execution check - run by test_sdv_compatibility_simple.py from tests/integration
+"""
+
+import sys
+import os
+import types
+sys.path.append('../../src')
+
+# Trigger SDV compatibility setup
+from uda_agent import UniversalDeploymentAgent
+
+# Create agent instance (this sets up SDV compatibility)
+agent = UniversalDeploymentAgent()
+
+print("🚀 Starting SDV App Test...")
+print("📦 Testing imports...")
+
+try:
+    from sdv.vdb.reply import DataPointReply
+    from sdv.vehicle_app import VehicleApp
+    print("✅ sdv imports successful!")
+except ImportError as e:
+    print(f"❌ sdv imports failed: {e}")
+    sys.exit(1)
+
+# Mock vehicle signal tree for testing: Vehicle.Body.Lights.Beam.Low.IsOn
+async def _set_light(value):
+    print(f"💡 Setting light to: {value}")
+
+async def _get_light():
+    return types.SimpleNamespace(value=True)
+
+_is_on = types.SimpleNamespace(set=_set_light, get=_get_light)
+vehicle = types.SimpleNamespace(Body=types.SimpleNamespace(Lights=types.SimpleNamespace(
+    Beam=types.SimpleNamespace(Low=types.SimpleNamespace(IsOn=_is_on)))))
+
+class TestApp(VehicleApp):
+    def __init__(self, vehicle_client):
+        super().__init__()
+        self.Vehicle = vehicle_client
+
+    async def on_start(self):
+        print("✅ SDV VehicleApp started successfully!")
+        print("🔄 Testing vehicle signal access...")
+
+        try:
+            await self.Vehicle.Body.Lights.Beam.Low.IsOn.set(True)
+            value = (await self.Vehicle.Body.Lights.Beam.Low.IsOn.get()).value
+            print(f"💡 Light value: {value}")
+
+            await self.Vehicle.Body.Lights.Beam.Low.IsOn.set(False)
+            print("✅ Vehicle signal access test passed!")
+        except Exception as e:
+            print(f"🔧 Vehicle signal test failed (expected without KUKSA): {e}")
+
+import asyncio
+
+async def main():
+    app = TestApp(vehicle)
+    await app.on_start()
+
+# Run the test
+asyncio.run(main())
+print("🎉 SDV App execution test completed successfully!")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+SDV compatibility check - run by test_sdv_compatibility_simple.py from tests/integration
+"""
+
+import sys
+sys.path.append('../../src')
+
+# Import UDA agent to trigger SDV compatibility setup
+from uda_agent import UniversalDeploymentAgent
+
+# Create agent instance to trigger compatibility setup
+agent = UniversalDeploymentAgent()
+
+print("✅ Agent created successfully")
+
+# Test if sdv imports work
+try:
+    # This should work if compatibility layer is set up correctly
+    import sdv.vdb.reply
+    print("✅ sdv.vdb.reply import successful")
+except ImportError as e:
+    print(f"❌ sdv.vdb.reply import failed: {e}")
+    sys.exit(1)
+
+try:
+    import sdv.vehicle_app
+    print("✅ sdv.vehicle_app import successful")
+except ImportError as e:
+    print(f"❌ sdv.vehicle_app import failed: {e}")
+    sys.exit(1)
+
+# Test if the modules have expected attributes
+try:
+    from sdv.vehicle_app import VehicleApp
+    print("✅ VehicleApp class imported successfully")
+except ImportError as e:
+    print(f"❌ VehicleApp import failed: {e}")
+    sys.exit(1)
+
+try:
+    from sdv.vdb.reply import DataPointReply
+    print("✅ DataPointReply imported successfully")
+except ImportError as e:
+    print(f"❌ DataPointReply import failed: {e}")
+    sys.exit(1)
+
+print("🎉 All SDV compatibility tests passed!")
@@ -4,13 +4,15 @@ Test script to simulate Kit Server deploy_request message with auto-service star
 """
 
 import socketio
-import time
 import json
-import subprocess
 import sys
 import os
-import signal
-import atexit
+import threading
+
+# Add parent directory to path for test_helpers
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from test_helpers import (check_mock_server_running, start_mock_server,
+                          start_uda_agent, check_uda_agent_running)
 
 def test_deploy_request():
     """Test deploy_request message to UDA agent"""
@@ -18,6 +20,9 @@ def test_deploy_request():
     # Create Socket.IO client
     sio = socketio.Client()
 
+    # Set once the deployed app reports its last line
+    app_finished = threading.Event()
+
     # Test Python code to deploy
     test_code = '''
 import time
@@ -60,14 +65,17 @@ print("✅ Test app completed successfully!")
             print(f"📦 Data: {json.dumps(data, indent=2)}")
         elif isinstance(data, str) and len(data) < 200:
             print(f"📦 Data: {data}")
+        if isinstance(data, dict) and 'Test app completed successfully!' in str(data.get('result', '')):
+            app_finished.set()
 
     try:
         print("🔌 Connecting to Mock Kit Server at http://localhost:3091...")
         sio.connect('http://localhost:3091')
 
-        # Wait for response with longer timeout for deployment
-        print("⏳ Waiting for deployment response (15 seconds)...")
-        time.sleep(15)
+        # Wait for the deployed app to finish, with a longer timeout for deployment
+        print("⏳ Waiting for deployment response (up to 15 seconds)...")
+        if not app_finished.wait(timeout=15):
+            print("⏰ Deployed app did not finish within 15 seconds")
 
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -75,139 +83,6 @@ print("✅ Test app completed successfully!")
         if sio.connected:
             sio.disconnect()
 
-def check_mock_server_running():
-    """Check if mock Kit Server is running on port 3091"""
-    try:
-        import socket
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(2)
-        result = sock.connect_ex(('localhost', 3091))
-        sock.close()
-        return result == 0
-    except:
-        return False
-
-def cleanup_existing_mock_servers():
-    """Kill any existing Mock Kit Server processes before starting new ones"""
-    try:
-        import subprocess
-        # Kill any processes using mock_kit_server.py
-        result = subprocess.run(['pkill', '-f', 'mock_kit_server.py'],
-                              capture_output=True, text=True)
-        # Also kill any process listening on port 3091
-        result = subprocess.run(['lsof', '-ti:3091'],
-                              capture_output=True, text=True)
-        if result.stdout.strip():
-            port_pids = result.stdout.strip().split('\n')
-            for pid in port_pids:
-                subprocess.run(['kill', '-9', pid], capture_output=True)
-        time.sleep(1)  # Give processes time to die
-    except:
-        pass
-
-def check_uda_agent_running():
-    """Check if UDA agent process is running"""
-    try:
-        result = subprocess.run(['pgrep', '-f', 'uda_agent.py.*localhost:3091'],
-                              capture_output=True, text=True)
-        return result.returncode == 0
-    except:
-        return False
-
-def start_mock_server():
-    """Start mock Kit Server"""
-    print("🚀 Starting Mock Kit Server automatically...")
-
-    # Cleanup any existing Mock Kit Server processes
-    cleanup_existing_mock_servers()
-
-    # Calculate paths BEFORE changing directory
-    mock_server_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'tests', 'tools', 'mock_kit_server.py')
-
-    # Change to tests directory
-    tests_dir = os.path.dirname(os.path.abspath(__file__))
-    os.chdir(tests_dir)
-
-    try:
-        # Start mock server in background
-        process = subprocess.Popen([
-            sys.executable, mock_server_path
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-        # Register cleanup function
-        atexit.register(lambda: cleanup_process(process, "Mock Kit Server"))
-
-        print(f"⏳ Waiting for Mock Kit Server to start (PID: {process.pid})...")
-
-        # Wait up to 10 seconds for server to start
-        for i in range(10):
-            if check_mock_server_running():
-                print(f"✅ Mock Kit Server started successfully!")
-                return process
-            time.sleep(1)
-            if (i + 1) % 3 == 0:
-                print(f"   Waiting... {i+1}/10")
-
-        print("❌ Mock Kit Server failed to start within 10 seconds")
-        cleanup_process(process, "Mock Kit Server")
-        return None
-
-    except Exception as e:
-        print(f"❌ Failed to start Mock Kit Server: {e}")
-        return None
-
-def start_uda_agent():
-    """Start UDA agent pointing to mock server"""
-    print("🚀 Starting UDA Agent with mock server...")
-
-    # Calculate paths BEFORE changing directory
-    uda_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    uda_agent_path = os.path.join(uda_dir, 'src', 'uda_agent.py')
-
-    # Change to the UDA directory
-    os.chdir(uda_dir)
-
-    try:
-        # Start UDA agent in background pointing to mock server
-        process = subprocess.Popen([
-            sys.executable, uda_agent_path, '--server', 'http://localhost:3091'
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-        # Register cleanup function
-        atexit.register(lambda: cleanup_process(process, "UDA Agent"))
-
-        print(f"⏳ Waiting for UDA Agent to start (PID: {process.pid})...")
-
-        # Wait up to 10 seconds for agent to start
-        for i in range(10):
-            if check_uda_agent_running():
-                print(f"✅ UDA Agent started successfully!")
-                return process
-            time.sleep(1)
-            if (i + 1) % 3 == 0:
-                print(f"   Waiting... {i+1}/10")
-
-        print("❌ UDA Agent failed to start within 10 seconds")
-        cleanup_process(process, "UDA Agent")
-        return None
-
-    except Exception as e:
-        print(f"❌ Failed to start UDA Agent: {e}")
-        return None
-
-def cleanup_process(process, name):
-    """Clean up background process"""
-    try:
-        if process.poll() is None:  # Process is still running
-            print(f"🛑 Stopping {name}...")
-            process.terminate()
-            process.wait(timeout=5)
-    except:
-        try:
-            process.kill()
-        except:
-            pass
-
 if __name__ == "__main__":
     print("🧪 Testing deploy_request message to UDA agent (with Auto-Setup)")
     print("=" * 70)
@@ -234,9 +109,6 @@ if __name__ == "__main__":
         else:
             print("✅ UDA Agent is already running!")
 
-        # Wait a moment for everything to be ready
-        time.sleep(2)
-
         # Run the test
         print("\n🧪 Running deploy_request test...")
         test_deploy_request()
@@ -3,20 +3,31 @@
 Test script to simulate Kit Server run_python_app message with auto-service startup
 """
 
+import asyncio
 import socketio
-import time
 import json
-import subprocess
 import sys
 import os
-import signal
-import atexit
 
-def test_run_python_app():
+# Add parent directory to path for test_helpers
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from test_helpers import (check_mock_server_running, start_mock_server,
+                          start_uda_agent, check_uda_agent_running)
+
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+async def test_run_python_app():
     """Test run_python_app message to UDA agent"""
 
     # Create Socket.IO client
-    sio = socketio.Client()
+    sio = socketio.AsyncClient()
+
+    # Set once the app's last line comes back
+    app_finished = asyncio.Event()
 
     # Simple test Python code
     test_code = '''
@@ -35,7 +46,7 @@ print("🎉 Direct execution completed!")
 '''
 
     @sio.event
-    def connect():
+    async def connect():
         print("✅ Connected to UDA agent")
 
         # Send run_python_app message
@@ -49,160 +60,42 @@ print("🎉 Direct execution completed!")
         }
 
         print("📤 Sending run_python_app message...")
-        sio.emit('messageToKit', run_message)
+        await sio.emit('messageToKit', run_message)
 
     @sio.event
-    def disconnect():
+    async def disconnect():
         print("❌ Disconnected from UDA agent")
 
-    @sio.on('*')
-    def catch_all(event, data):
-        print(f"📨 Received event: {event}")
-        if isinstance(data, dict) and len(str(data)) < 500:
+    @sio.on('messageToKit-kitReply')
+    async def on_kit_reply(data):
+        print(f"📨 Received messageToKit-kitReply: {data.get('cmd', 'N/A')} -> {str(data.get('result', ''))[:100]}")
+        if os.getenv('UDA_TEST_TRACE'):
+            print(f"📦 Data: {json.dumps(data, indent=2)}")
+        if 'Direct execution completed!' in str(data.get('result', '')):
+            app_finished.set()
+
+    @sio.on('messageToKit')
+    async def on_message_to_kit(data):
+        # Error responses from the Mock Kit Server (e.g. unknown kit) arrive here
+        print(f"📨 Received messageToKit: {data.get('cmd', 'N/A')} -> {str(data.get('result', ''))[:100]}")
+        if os.getenv('UDA_TEST_TRACE'):
             print(f"📦 Data: {json.dumps(data, indent=2)}")
-        elif isinstance(data, str) and len(data) < 200:
-            print(f"📦 Data: {data}")
 
     try:
         print("🔌 Connecting to Mock Kit Server at http://localhost:3091...")
-        sio.connect('http://localhost:3091')
+        await sio.connect('http://localhost:3091')
 
         # Wait for response and app execution
-        time.sleep(15)
+        try:
+            await asyncio.wait_for(app_finished.wait(), timeout=15)
+        except asyncio.TimeoutError:
+            print("⏰ App did not finish within 15 seconds")
 
     except Exception as e:
         print(f"❌ Error: {e}")
     finally:
         if sio.connected:
-            sio.disconnect()
-
-def check_mock_server_running():
-    """Check if mock Kit Server is running on port 3091"""
-    try:
-        import socket
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(2)
-        result = sock.connect_ex(('localhost', 3091))
-        sock.close()
-        return result == 0
-    except:
-        return False
-
-
-def cleanup_existing_mock_servers():
-    """Kill any existing Mock Kit Server processes before starting new ones"""
-    try:
-        import subprocess
-        # Kill any processes using mock_kit_server.py
-        result = subprocess.run(['pkill', '-f', 'mock_kit_server.py'],
-                              capture_output=True, text=True)
-        # Also kill any process listening on port 3091
-        result = subprocess.run(['lsof', '-ti:3091'],
-                              capture_output=True, text=True)
-        if result.stdout.strip():
-            port_pids = result.stdout.strip().split('\n')
-            for pid in port_pids:
-                subprocess.run(['kill', '-9', pid], capture_output=True)
-        time.sleep(1)  # Give processes time to die
-    except:
-        pass
-
-
-def check_uda_agent_running():
-    """Check if UDA agent process is running"""
-    try:
-        result = subprocess.run(['pgrep', '-f', 'uda_agent.py.*localhost:3091'],
-                              capture_output=True, text=True)
-        return result.returncode == 0
-    except:
-        return False
-
-def start_mock_server():
-    """Start mock Kit Server"""
-    print("🚀 Starting Mock Kit Server automatically...")
-
-    # Change to tests directory
-    tests_dir = os.path.dirname(os.path.abspath(__file__))
-    os.chdir(tests_dir)
-
-    try:
-        # Start mock server in background
-        mock_server_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'tests', 'tools', 'mock_kit_server.py')
-        process = subprocess.Popen([
-            sys.executable, mock_server_path
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-        # Register cleanup function
-        atexit.register(lambda: cleanup_process(process, "Mock Kit Server"))
-
-        print(f"⏳ Waiting for Mock Kit Server to start (PID: {process.pid})...")
-
-        # Wait up to 10 seconds for server to start
-        for i in range(10):
-            if check_mock_server_running():
-                print(f"✅ Mock Kit Server started successfully!")
-                return process
-            time.sleep(1)
-            if (i + 1) % 3 == 0:
-                print(f"   Waiting... {i+1}/10")
-
-        print("❌ Mock Kit Server failed to start within 10 seconds")
-        cleanup_process(process, "Mock Kit Server")
-        return None
-
-    except Exception as e:
-        print(f"❌ Failed to start Mock Kit Server: {e}")
-        return None
-
-def start_uda_agent():
-    """Start UDA agent pointing to mock server"""
-    print("🚀 Starting UDA Agent with mock server...")
-
-    # Change to the UDA directory
-    uda_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    os.chdir(uda_dir)
-
-    try:
-        # Start UDA agent in background pointing to mock server
-        uda_agent_path = os.path.join(uda_dir, 'src', 'uda_agent.py')
-        process = subprocess.Popen([
-            sys.executable, uda_agent_path, '--server', 'http://localhost:3091'
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-        # Register cleanup function
-        atexit.register(lambda: cleanup_process(process, "UDA Agent"))
-
-        print(f"⏳ Waiting for UDA Agent to start (PID: {process.pid})...")
-
-        # Wait up to 10 seconds for agent to start
-        for i in range(10):
-            if check_uda_agent_running():
-                print(f"✅ UDA Agent started successfully!")
-                return process
-            time.sleep(1)
-            if (i + 1) % 3 == 0:
-                print(f"   Waiting... {i+1}/10")
-
-        print("❌ UDA Agent failed to start within 10 seconds")
-        cleanup_process(process, "UDA Agent")
-        return None
-
-    except Exception as e:
-        print(f"❌ Failed to start UDA Agent: {e}")
-        return None
-
-def cleanup_process(process, name):
-    """Clean up background process"""
-    try:
-        if process.poll() is None:  # Process is still running
-            print(f"🛑 Stopping {name}...")
-            process.terminate()
-            process.wait(timeout=5)
-    except:
-        try:
-            process.kill()
-        except:
-            pass
+            await sio.disconnect()
 
 if __name__ == "__main__":
     print("🧪 Testing run_python_app message to UDA agent (with Auto-Setup)")
@@ -230,12 +123,9 @@ if __name__ == "__main__":
         else:
             print("✅ UDA Agent is already running!")
 
-        # Wait a moment for everything to be ready
-        time.sleep(2)
-
         # Run the test
         print("\n🧪 Running run_python_app test...")
-        test_run_python_app()
+        asyncio.run(test_run_python_app())
 
     except KeyboardInterrupt:
         print("\n🛑 Test interrupted by user")
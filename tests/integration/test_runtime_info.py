@@ -4,13 +4,14 @@ Test script to simulate Kit Server get-runtime-info message with auto-service st
 """
 
 import socketio
-import time
 import json
-import subprocess
 import sys
 import os
-import signal
-import atexit
+
+# Add parent directory to path for test_helpers
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from test_helpers import (check_mock_server_running, start_mock_server,
+                          start_uda_agent, check_uda_agent_running)
 
 def test_runtime_info():
     """Test get-runtime-info message to UDA agent"""
@@ -22,35 +23,25 @@ def test_runtime_info():
     def connect():
         print("✅ Connected to UDA agent")
 
-        # Send get-runtime-info message
-        info_message = {
-            "cmd": "get-runtime-info",
-            "request_from": "test-client-004",
-            "to_kit_id": "Runtime-UDA-5dc4bfa4"
-        }
-
-        print("📤 Sending get-runtime-info message...")
-        sio.emit('messageToKit', info_message)
-
     @sio.event
     def disconnect():
         print("❌ Disconnected from UDA agent")
 
-    @sio.on('*')
-    def catch_all(event, data):
-        print(f"📨 Received event: {event}")
-        if isinstance(data, dict) and len(str(data)) < 800:
-            print(f"📦 Data: {json.dumps(data, indent=2)}")
-        elif isinstance(data, str) and len(data) < 300:
-            print(f"📦 Data: {data}")
-
     try:
         print("🔌 Connecting to Mock Kit Server at http://localhost:3091...")
         sio.connect('http://localhost:3091')
 
-        # Wait for response with longer timeout
-        print("⏳ Waiting for response (10 seconds)...")
-        time.sleep(10)
+        # Send get-runtime-info message; the server acks with the agent's reply
+        info_message = {
+            "cmd": "get-runtime-info",
+            "request_from": "test-client-004",
+            "to_kit_id": "Runtime-UDA-5dc4bfa4"
+        }
+
+        print("📤 Sending get-runtime-info message...")
+        response = sio.call('messageToKit', info_message, timeout=10)
+        print("📨 Received response:")
+        print(f"📦 Data: {json.dumps(response, indent=2)}")
 
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -58,114 +49,6 @@ def test_runtime_info():
         if sio.connected:
             sio.disconnect()
 
-def check_mock_server_running():
-    """Check if mock Kit Server is running on port 3091"""
-    try:
-        import socket
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(2)
-        result = sock.connect_ex(('localhost', 3091))
-        sock.close()
-        return result == 0
-    except:
-        return False
-
-def check_uda_agent_running():
-    """Check if UDA agent process is running"""
-    try:
-        result = subprocess.run(['pgrep', '-f', 'uda_agent.py.*localhost:3091'],
-                              capture_output=True, text=True)
-        return result.returncode == 0
-    except:
-        return False
-
-def start_mock_server():
-    """Start mock Kit Server"""
-    print("🚀 Starting Mock Kit Server automatically...")
-
-    # Change to tests directory
-    tests_dir = os.path.dirname(os.path.abspath(__file__))
-    os.chdir(tests_dir)
-
-    try:
-        # Start mock server in background
-        mock_server_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'tests', 'tools', 'mock_kit_server.py')
-        process = subprocess.Popen([
-            sys.executable, mock_server_path
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-        # Register cleanup function
-        atexit.register(lambda: cleanup_process(process, "Mock Kit Server"))
-
-        print(f"⏳ Waiting for Mock Kit Server to start (PID: {process.pid})...")
-
-        # Wait up to 10 seconds for server to start
-        for i in range(10):
-            if check_mock_server_running():
-                print(f"✅ Mock Kit Server started successfully!")
-                return process
-            time.sleep(1)
-            if (i + 1) % 3 == 0:
-                print(f"   Waiting... {i+1}/10")
-
-        print("❌ Mock Kit Server failed to start within 10 seconds")
-        cleanup_process(process, "Mock Kit Server")
-        return None
-
-    except Exception as e:
-        print(f"❌ Failed to start Mock Kit Server: {e}")
-        return None
-
-def start_uda_agent():
-    """Start UDA agent pointing to mock server"""
-    print("🚀 Starting UDA Agent with mock server...")
-
-    # Change to the UDA directory
-    uda_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    os.chdir(uda_dir)
-
-    try:
-        # Start UDA agent in background pointing to mock server
-        uda_agent_path = os.path.join(uda_dir, 'src', 'uda_agent.py')
-        process = subprocess.Popen([
-            sys.executable, uda_agent_path, '--server', 'http://localhost:3091'
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-        # Register cleanup function
-        atexit.register(lambda: cleanup_process(process, "UDA Agent"))
-
-        print(f"⏳ Waiting for UDA Agent to start (PID: {process.pid})...")
-
-        # Wait up to 10 seconds for agent to start
-        for i in range(10):
-            if check_uda_agent_running():
-                print(f"✅ UDA Agent started successfully!")
-                return process
-            time.sleep(1)
-            if (i + 1) % 3 == 0:
-                print(f"   Waiting... {i+1}/10")
-
-        print("❌ UDA Agent failed to start within 10 seconds")
-        cleanup_process(process, "UDA Agent")
-        return None
-
-    except Exception as e:
-        print(f"❌ Failed to start UDA Agent: {e}")
-        return None
-
-def cleanup_process(process, name):
-    """Clean up background process"""
-    try:
-        if process.poll() is None:  # Process is still running
-            print(f"🛑 Stopping {name}...")
-            process.terminate()
-            process.wait(timeout=5)
-    except:
-        try:
-            process.kill()
-        except:
-            pass
-
 if __name__ == "__main__":
     print("🧪 Testing get-runtime-info message to UDA agent (with Auto-Setup)")
     print("=" * 70)
@@ -192,9 +75,6 @@ if __name__ == "__main__":
         else:
             print("✅ UDA Agent is already running!")
 
-        # Wait a moment for everything to be ready
-        time.sleep(2)
-
         # Run the test
         print("\n🧪 Running get-runtime-info test...")
         test_runtime_info()
@@ -4,7 +4,6 @@ Simple Runtime Info Test with Mock Kit Server precondition
 """
 
 import socketio
-import time
 import sys
 import os
 
@@ -12,6 +11,13 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from test_helpers import ensure_mock_server_running, ensure_uda_agent_running
 
+# Static get-runtime-info request, built once per module
+_INFO_MSG = {
+    "cmd": "get-runtime-info",
+    "request_from": "test-client-005",
+    "to_kit_id": "Runtime-UDA-5dc4bfa4"
+}
+
 def test_runtime_info():
     """Test get-runtime-info message with Mock Kit Server precondition"""
 
@@ -35,29 +41,7 @@ def test_runtime_info():
 
     @sio.event
     def connect():
-        print("✅ Connected to UDA Agent")
-
-        # Send get-runtime-info message
-        info_message = {
-            "cmd": "get-runtime-info",
-            "request_from": "test-client-005",
-            "to_kit_id": "Runtime-UDA-5dc4bfa4"
-        }
-
-        print(f"📤 Sending get-runtime-info message...")
-        sio.emit('messageToKit', info_message)
-
-    @sio.event
-    def messageToKit_kitReply(data):
-        print("📨 Received messageToKit-kitReply response:")
-        print(f"   Command: {data.get('cmd', 'N/A')}")
-        print(f"   Result: {data.get('result', 'N/A')[:100]}{'...' if len(data.get('result', '')) > 100 else ''}")
-        print(f"   Is Done: {data.get('isDone', 'N/A')}")
-        print(f"   Code: {data.get('code', 'N/A')}")
-
-        # Test completed successfully
-        sio.disconnect()
-        return True
+        print("✅ Connected to Mock Kit Server")
 
     @sio.event
     def connect_error(data):
@@ -66,20 +50,23 @@ def test_runtime_info():
 
     @sio.event
     def disconnect():
-        print("🔌 Disconnected from UDA Agent")
+        print("🔌 Disconnected from Mock Kit Server")
 
-    # Connect to UDA Agent (port 3090)
+    # Connect to the Mock Kit Server, which acks with the agent's reply
     try:
-        print("🔌 Connecting to UDA Agent...")
-        sio.connect('http://localhost:3090', wait_timeout=10)
+        print("🔌 Connecting to Mock Kit Server...")
+        sio.connect('http://localhost:3091', wait_timeout=10)
 
-        # Wait for response
-        print("⏳ Waiting for response...")
-        time.sleep(5)
+        print(f"📤 Sending get-runtime-info message...")
+        data = sio.call('messageToKit', _INFO_MSG, timeout=10)
 
-        # Disconnect if still connected
-        if sio.connected:
-            sio.disconnect()
+        print("📨 Received messageToKit-kitReply response:")
+        print(f"   Command: {data.get('cmd', 'N/A')}")
+        print(f"   Result: {data.get('result', 'N/A')[:100]}{'...' if len(data.get('result', '')) > 100 else ''}")
+        print(f"   Is Done: {data.get('isDone', 'N/A')}")
+        print(f"   Code: {data.get('code', 'N/A')}")
+
+        sio.disconnect()
 
         print("✅ Test completed successfully")
         return True
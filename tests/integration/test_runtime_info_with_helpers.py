@@ -13,6 +13,13 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from test_helpers import setup_test_environment, teardown_test_environment
 
+# Static get-runtime-info request, built once per module
+_INFO_MSG = {
+    "cmd": "get-runtime-info",
+    "request_from": "helper-test-client",
+    "to_kit_id": "Runtime-UDA-5dc4bfa4"
+}
+
 def test_runtime_info_with_helpers():
     """Test get-runtime-info message using helper functions"""
 
@@ -40,14 +47,8 @@ def test_runtime_info_with_helpers():
             test_results['connected'] = True
 
             # Send get-runtime-info message
-            info_message = {
-                "cmd": "get-runtime-info",
-                "request_from": "helper-test-client",
-                "to_kit_id": "Runtime-UDA-5dc4bfa4"
-            }
-
             print(f"📤 Sending get-runtime-info message...")
-            sio.emit('messageToKit', info_message)
+            sio.emit('messageToKit', _INFO_MSG)
 
         @sio.event
         def messageToKit_kitReply(data):
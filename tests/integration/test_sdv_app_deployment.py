@@ -7,7 +7,6 @@ Tests the complete deployment workflow with SDV compatibility layer
 import socketio
 import time
 import json
-import threading
 import sys
 import os
 import subprocess
@@ -15,6 +14,7 @@ import subprocess
 # Add parent directories for imports
 sys.path.append('..')
 sys.path.append('../tools')
+from test_helpers import drain_output, print_output_tail
 
 # Check what mock servers are available
 try:
@@ -57,7 +57,10 @@ class TestSDVAppDeployment:
                 sys.executable, '../src/uda_agent.py',
                 '--server', 'http://localhost:3091'
             ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-               text=True, env=env, cwd='.')
+               env=env, cwd='.')
+
+            # Drain the pipe so the agent never blocks on a full buffer
+            drain_output(self.agent_process, "UDA Agent")
 
             print("✅ Agent process started")
             return True
@@ -69,9 +72,9 @@ class TestSDVAppDeployment:
     def wait_for_agent_registration(self, timeout=10):
         """Wait for agent to register with Kit Server"""
         print("⏳ Waiting for agent registration...")
-        start_time = time.time()
+        deadline = time.monotonic() + timeout
 
-        while time.time() - start_time < timeout:
+        while time.monotonic() < deadline:
             if self.kit_server.registered_kits:
                 kit_id = list(self.kit_server.registered_kits.keys())[0]
                 print(f"✅ Agent registered: {kit_id}")
@@ -80,6 +83,7 @@ class TestSDVAppDeployment:
             time.sleep(0.5)
 
         print("⏰ Agent registration timeout")
+        print_output_tail("UDA Agent")
         return False
 
     def deploy_sdv_app(self):
@@ -159,9 +163,9 @@ LOOP.close()
     def wait_for_app_execution(self, timeout=15):
         """Wait for app execution and output"""
         print("⏳ Waiting for app execution...")
-        start_time = time.time()
+        deadline = time.monotonic() + timeout
 
-        while time.time() - start_time < timeout:
+        while time.monotonic() < deadline:
             # Check for SDV-related output messages
             for kit_id, messages in self.kit_server.received_messages.items():
                 for msg in messages:
@@ -231,6 +235,7 @@ LOOP.close()
             print("5️⃣ Monitoring App Execution...")
             if not self.wait_for_app_execution():
                 print("⚠️ App execution may have failed or timed out")
+                print_output_tail("UDA Agent")
 
             # Print results
             print("\n📊 Test Results:")
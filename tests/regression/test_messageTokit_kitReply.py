@@ -3,48 +3,52 @@
 Comprehensive test to verify UDA agent emits correct messageToKit-kitReply events
 """
 
+import asyncio
 import socketio
 import time
 import json
 import subprocess
 import sys
 import os
-import signal
 import atexit
-import threading
-
-def test_comprehensive_messaging():
+import collections
+
+# Add parent directory to path for test_helpers
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from test_helpers import (cleanup_process, drain_output, wait_until_ready,
+                          print_output_tail, UDA_REGISTERED_MARKER,
+                          cleanup_existing_mock_servers, record_mock_server,
+                          check_mock_server_running)
+
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+async def test_comprehensive_messaging(uda_process):
     """Test complete messageToKit-kitReply flow"""
 
     # Create Socket.IO client for testing
-    sio = socketio.Client()
+    sio = socketio.AsyncClient()
+
+    # Track received events, keeping only the most recent ones so a chatty
+    # streaming run cannot grow the list without bound
+    received_events = collections.deque(maxlen=1000)
 
-    # Track received events
-    received_events = []
+    # Set once the final messageToKit-kitReply arrives
+    reply_done = asyncio.Event()
 
     @sio.event
-    def connect():
+    async def connect():
         print("✅ Test client connected to Mock Kit Server")
 
-        # Wait a moment for UDA agent to be ready
-        time.sleep(2)
-
-        # Send runtime info request
-        message = {
-            'cmd': 'get-runtime-info',
-            'request_from': 'comprehensive-test-client',
-            'to_kit_id': 'Runtime-UDA-5dc4bfa4'
-        }
-        print(f"📤 Sending get-runtime-info request: {json.dumps(message, indent=2)}")
-        sio.emit('messageToKit', message)
-        print("🔍 Waiting for messageToKit-kitReply response...")
-
     @sio.event
-    def disconnect():
+    async def disconnect():
         print("❌ Test client disconnected")
 
     @sio.on('*')
-    def catch_all(event, data):
+    async def catch_all(event, data):
         timestamp = time.strftime('%H:%M:%S')
         print(f"\n[{timestamp}] 📨 EVENT RECEIVED: {event}")
 
@@ -74,6 +78,8 @@ def test_comprehensive_messaging():
             print(f"   Kit ID: {kit_id}")
             print(f"   Command: {cmd}")
             print(f"   Is Done: {is_done}")
+            if is_done:
+                reply_done.set()
 
         elif event == 'messageToKit':
             if isinstance(data, dict):
@@ -93,26 +99,54 @@ def test_comprehensive_messaging():
         # Add connection timeout and retry logic for container environments
         for attempt in range(3):
             try:
-                sio.connect('http://localhost:3091', transports=['polling'], socketio_path='socket.io')
+                # Let the client upgrade to websocket: against the aiohttp
+                # server a polling-only client takes ~30s to disconnect
+                await sio.connect('http://localhost:3091')
                 break
             except Exception as e:
                 print(f"⚠️  Connection attempt {attempt + 1} failed: {e}")
                 if attempt < 2:
                     print("🔄 Retrying in 2 seconds...")
-                    time.sleep(2)
+                    await asyncio.sleep(2)
                 else:
                     raise
 
-        # Wait for responses
-        print("⏳ Waiting for events (15 seconds)...")
-        time.sleep(15)
+        # The client handshake above overlaps the agent's startup; only now
+        # wait for the agent to register before sending it anything
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, wait_for_uda_agent, uda_process):
+            return False
 
-        # Analyze results
+        # Send runtime info request
+        message = {
+            'cmd': 'get-runtime-info',
+            'request_from': 'comprehensive-test-client',
+            'to_kit_id': 'Runtime-UDA-5dc4bfa4'
+        }
+        print(f"📤 Sending get-runtime-info request: {json.dumps(message, indent=2)}")
+        await sio.emit('messageToKit', message)
+        print("🔍 Waiting for messageToKit-kitReply response...")
+
+        # Wait for the final reply
+        print("⏳ Waiting for events (up to 15 seconds)...")
+        try:
+            await asyncio.wait_for(reply_done.wait(), timeout=15)
+        except asyncio.TimeoutError:
+            print("⏰ No final messageToKit-kitReply within 15 seconds")
+
+        # Analyze a snapshot, since late events may still be arriving
+        events = list(received_events)
         print(f"\n📊 ANALYSIS:")
-        print(f"   Total events received: {len(received_events)}")
+        print(f"   Total events received: {len(events)}")
+        if len(events) == received_events.maxlen:
+            print(f"   (only the last {received_events.maxlen} events were kept)")
 
-        messageToKit_events = [e for e in received_events if e['event'] == 'messageToKit']
-        messageToKit_kitReply_events = [e for e in received_events if e['event'] == 'messageToKit-kitReply']
+        # Group by event name in a single pass
+        events_by_name = collections.defaultdict(list)
+        for e in events:
+            events_by_name[e['event']].append(e)
+        messageToKit_events = events_by_name['messageToKit']
+        messageToKit_kitReply_events = events_by_name['messageToKit-kitReply']
 
         print(f"   messageToKit events: {len(messageToKit_events)}")
         print(f"   messageToKit-kitReply events: {len(messageToKit_kitReply_events)}")
@@ -130,111 +164,82 @@ def test_comprehensive_messaging():
             if messageToKit_events:
                 print(f"   UDA agent is using messageToKit instead of messageToKit-kitReply")
 
-        if received_events:
+        if events:
             print(f"\n📝 Event Timeline:")
-            for i, event in enumerate(received_events):
+            for i, event in enumerate(events):
                 print(f"   {i+1}. [{event['timestamp']}] {event['event']}")
 
     except Exception as e:
         print(f"❌ Test error: {e}")
     finally:
         if sio.connected:
-            sio.disconnect()
+            await sio.disconnect()
 
 def start_mock_server():
     """Start mock Kit Server"""
     print("🚀 Starting Mock Kit Server...")
 
+    # Cleanup any existing Mock Kit Server processes
+    cleanup_existing_mock_servers()
+
     # Use absolute path to mock_kit_server.py
     mock_server_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'tests', 'tools', 'mock_kit_server.py')
     process = subprocess.Popen([
         sys.executable, mock_server_path
-    ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-       universal_newlines=True, cwd='.')
+    ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    drain_output(process, "MOCK")
+    record_mock_server(process)
 
     atexit.register(lambda: cleanup_process(process, "Mock Kit Server"))
 
-    # Wait for server to start
-    time.sleep(3)
-
-    # Check if server started successfully
-    if process.poll() is None:
-        print(f"✅ Mock Kit Server started (PID: {process.pid})")
-        return process
-    else:
-        print("❌ Mock Kit Server failed to start")
-        return None
+    # Wait up to 10 seconds for the server to accept connections, probing with
+    # exponential backoff (20ms growing to 500ms) so a fast start isn't padded out
+    delay = 0.02
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline and process.poll() is None:
+        if check_mock_server_running():
+            print(f"✅ Mock Kit Server started (PID: {process.pid})")
+            return process
+        time.sleep(delay)
+        delay = min(delay * 1.5, 0.5)
+
+    print("❌ Mock Kit Server failed to start")
+    print_output_tail("MOCK")
+    return None
 
 def start_uda_agent():
     """Start UDA Agent"""
     print("🚀 Starting UDA Agent...")
 
-    # Change to parent directory (UDA Agent root)
+    # UDA Agent root; the agent resolves ./deployments and ./logs against its cwd
     uda_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    os.chdir(uda_dir)
 
     uda_agent_path = os.path.join(uda_dir, 'src', 'uda_agent.py')
     process = subprocess.Popen([
         sys.executable, uda_agent_path, '--server', 'http://localhost:3091'
-    ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-       universal_newlines=True)
+    ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=uda_dir)
+    drain_output(process, "UDA", ready_marker=UDA_REGISTERED_MARKER)
 
     atexit.register(lambda: cleanup_process(process, "UDA Agent"))
 
-    # Change back to tests directory
-    tests_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    tests_dir = os.path.join(tests_dir, 'tests')
-    os.chdir(tests_dir)
+    return process
 
-    # Wait for agent to start and connect
+def wait_for_uda_agent(process):
+    """Wait for a started UDA Agent to register; returns False if it exited"""
+    # Wait up to 10 seconds for the agent to register; the drain thread also
+    # wakes us if the agent exits first
     print(f"⏳ Waiting for UDA Agent to start and connect (PID: {process.pid})...")
-    time.sleep(5)
+    if not wait_until_ready("UDA", timeout=10):
+        print("⚠️  UDA Agent has not registered yet, continuing anyway")
 
     # Check if agent started successfully
     if process.poll() is None:
         print(f"✅ UDA Agent started successfully")
-        return process
+        return True
     else:
         print("❌ UDA Agent failed to start")
-        return None
-
-def cleanup_process(process, name):
-    """Clean up background process"""
-    try:
-        if process.poll() is None:
-            print(f"🛑 Stopping {name}...")
-            process.terminate()
-            try:
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                process.kill()
-    except:
-        pass
-
-def monitor_processes(mock_process, uda_process):
-    """Monitor background processes and output their logs"""
-    def monitor():
-        while mock_process and mock_process.poll() is None:
-            try:
-                line = mock_process.stdout.readline()
-                if line:
-                    print(f"[MOCK] {line.strip()}")
-            except:
-                break
-
-        while uda_process and uda_process.poll() is None:
-            try:
-                line = uda_process.stdout.readline()
-                if line:
-                    print(f"[UDA] {line.strip()}")
-            except:
-                break
-
-    # Start monitoring in background thread
-    monitor_thread = threading.Thread(target=monitor, daemon=True)
-    monitor_thread.start()
-
-    return monitor_thread
+        print_output_tail("UDA")
+        return False
 
 if __name__ == "__main__":
     print("🧪 Comprehensive messageToKit-kitReply Test")
@@ -252,17 +257,14 @@ if __name__ == "__main__":
         if not mock_process:
             sys.exit(1)
 
-        # Start UDA Agent
+        # Start UDA Agent; the test waits for it to register after its own
+        # client has connected
         uda_process = start_uda_agent()
-        if not uda_process:
-            sys.exit(1)
-
-        # Start monitoring processes (optional, can be noisy)
-        # monitor_thread = monitor_processes(mock_process, uda_process)
 
         # Run the comprehensive test
         print("\n🧪 Starting comprehensive messaging test...")
-        test_comprehensive_messaging()
+        if asyncio.run(test_comprehensive_messaging(uda_process)) is False:
+            sys.exit(1)
 
     except KeyboardInterrupt:
         print("\n🛑 Test interrupted by user")
@@ -69,22 +69,16 @@ def run_test(test_file, test_dir, description):
     test_path = os.path.join(test_dir, test_file)
 
     try:
-        # Change to appropriate directory for test execution
-        original_cwd = os.getcwd()
-        if test_dir != ".":
-            os.chdir(test_dir)
-
         # Update paths in tests that need to reference tools
+        base_dir = os.getcwd()
         env = os.environ.copy()
         if test_dir != ".":
-            env['PYTHONPATH'] = os.path.join(original_cwd, test_dir) + ':' + os.path.join(original_cwd, 'tools')
+            env['PYTHONPATH'] = os.path.join(base_dir, test_dir) + ':' + os.path.join(base_dir, 'tools')
 
-        # Run the test
+        # Run the test from its category directory (cwd= leaves our own CWD alone)
         result = subprocess.run([
             sys.executable, test_file
-        ], capture_output=True, text=True, timeout=60, env=env)
-
-        os.chdir(original_cwd)
+        ], capture_output=True, text=True, timeout=60, env=env, cwd=test_dir)
 
         print("📤 STDOUT:")
         if result.stdout:
@@ -105,11 +99,9 @@ def run_test(test_file, test_dir, description):
 
     except subprocess.TimeoutExpired:
         print("⏰ Test timed out after 60 seconds")
-        os.chdir(original_cwd)
         return False
     except Exception as e:
         print(f"❌ Error running test: {e}")
-        os.chdir(original_cwd)
         return False
 
 def run_test_suite(suite, fast_mode=False):
@@ -142,38 +134,47 @@ def generate_test_report(results):
     """Generate test execution report"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    print(f"\n{'='*80}")
-    print(f"📊 UDA Agent Test Report")
-    print(f"{'='*80}")
-    print(f"🕐 Timestamp: {timestamp}")
-    print(f"\n📋 Test Results Summary:")
+    # Collect the summary and print it in one go
+    lines = [
+        f"\n{'='*80}",
+        f"📊 UDA Agent Test Report",
+        f"{'='*80}",
+        f"🕐 Timestamp: {timestamp}",
+        f"\n📋 Test Results Summary:",
+    ]
+
+    # Report file body, built in the same pass over the results
+    report_lines = [
+        "UDA Agent Test Report",
+        f"Generated: {timestamp}",
+        f"{'='*50}\n",
+    ]
 
     total_passed = 0
     total_tests = 0
 
     for suite_name, (passed, total) in results.items():
         status = "✅ PASS" if passed == total else "❌ FAIL"
-        print(f"   {suite_name}: {passed}/{total} tests {status}")
+        lines.append(f"   {suite_name}: {passed}/{total} tests {status}")
+        report_lines.append(f"{suite_name}: {passed}/{total} passed")
         total_passed += passed
         total_tests += total
 
     success_rate = (total_passed / total_tests * 100) if total_tests > 0 else 0
-    print(f"\n🎯 Overall: {total_passed}/{total_tests} tests passed ({success_rate:.1f}%)")
+    lines.append(f"\n🎯 Overall: {total_passed}/{total_tests} tests passed ({success_rate:.1f}%)")
 
     if total_passed == total_tests:
-        print("🎉 All tests passed! UDA agent is ready for production.")
+        lines.append("🎉 All tests passed! UDA agent is ready for production.")
     else:
-        print("⚠️  Some tests failed. Please review the output above.")
+        lines.append("⚠️  Some tests failed. Please review the output above.")
+
+    print("\n".join(lines))
 
     # Save report to file
     report_file = f"test_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+    report_lines.append(f"\nOverall: {total_passed}/{total_tests} passed ({success_rate:.1f}%)\n")
     with open(report_file, 'w') as f:
-        f.write(f"UDA Agent Test Report\n")
-        f.write(f"Generated: {timestamp}\n")
-        f.write(f"{'='*50}\n\n")
-        for suite_name, (passed, total) in results.items():
-            f.write(f"{suite_name}: {passed}/{total} passed\n")
-        f.write(f"\nOverall: {total_passed}/{total_tests} passed ({success_rate:.1f}%)\n")
+        f.write("\n".join(report_lines))
 
     print(f"\n📄 Report saved to: {report_file}")
 
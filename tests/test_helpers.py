@@ -9,8 +9,234 @@ import time
 import socket
 import sys
 import os
+import tempfile
+import select
+import signal
 import atexit
-import psutil
+import collections
+import threading
+
+# Line the UDA Agent logs once the Kit Server acknowledged its registration
+UDA_REGISTERED_MARKER = b'Runtime registration acknowledged'
+
+# A started Mock Kit Server's PID is recorded here so a later run can stop it
+MOCK_SERVER_PIDFILE = os.path.join(tempfile.gettempdir(),
+                                   f'uda_mock_kit_server-{os.getuid()}.pid')
+
+# Last lines each child process printed, keyed by name
+_output_tails = {}
+
+# Set once a child printed its readiness marker (or exited), keyed by name
+_ready_events = {}
+
+def drain_output(process, name, ready_marker=None, echo=False):
+    """Keep reading a child's output in the background so it never stalls on a full pipe.
+
+    Each process gets its own thread, so neither waits on the other. Lines are
+    echoed as [name] when `echo` or UDA_TEST_TRACE is set. _ready_events[name]
+    is set on the first line containing `ready_marker`, or when the output ends.
+    """
+    tail = _output_tails[name] = collections.deque(maxlen=200)
+    ready = _ready_events[name] = threading.Event()
+    echo = echo or bool(os.getenv('UDA_TEST_TRACE'))
+
+    def drain():
+        try:
+            for line in process.stdout:
+                tail.append(line)
+                if echo:
+                    print(f"[{name}] {line.decode(errors='replace').rstrip()}")
+                if ready_marker is not None and ready_marker in line:
+                    ready.set()
+        finally:
+            ready.set()
+
+    threading.Thread(target=drain, daemon=True).start()
+
+def wait_until_ready(name, timeout):
+    """Wait for a drained child to print its readiness marker; False on timeout"""
+    return _ready_events[name].wait(timeout)
+
+def print_output_tail(name, lines=20):
+    """Show the last lines a child printed, e.g. after it failed to start"""
+    for line in list(_output_tails.get(name, ()))[-lines:]:
+        print(f"   | {line.decode(errors='replace').rstrip()}")
+
+def check_uda_agent_running(server='localhost:3091'):
+    """Check if a UDA agent process (pointed at `server`, if given) is running"""
+    # Scan /proc once instead of forking pgrep
+    try:
+        for pid in os.listdir('/proc'):
+            if not pid.isdigit():
+                continue
+            try:
+                with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                    cmdline = f.read()
+            except OSError:
+                continue
+            if b'uda_agent.py' in cmdline and (server is None or server.encode() in cmdline):
+                return True
+        return False
+    except:
+        return False
+
+def record_mock_server(process):
+    """Write a started Mock Kit Server's PID to the pidfile; it is removed again at exit"""
+    with open(MOCK_SERVER_PIDFILE, 'w') as f:
+        f.write(str(process.pid))
+    atexit.register(forget_mock_server, process.pid)
+
+def forget_mock_server(pid):
+    """Remove the pidfile if it still names this Mock Kit Server"""
+    try:
+        with open(MOCK_SERVER_PIDFILE) as f:
+            if int(f.read()) != pid:
+                return
+        os.remove(MOCK_SERVER_PIDFILE)
+    except (OSError, ValueError):
+        pass
+
+def _is_mock_server(pid):
+    """Check whether a PID runs mock_kit_server.py (as a script argument, not just a substring)"""
+    with open(f'/proc/{pid}/cmdline', 'rb') as f:
+        return any(arg.endswith(b'mock_kit_server.py') for arg in f.read().split(b'\0'))
+
+def _kill_and_wait(pid):
+    """SIGKILL a process and wait up to 1s for it to exit"""
+    pidfd = os.pidfd_open(pid)
+    try:
+        os.kill(pid, signal.SIGKILL)
+        # Wait until it has actually exited (and released port 3091)
+        select.select([pidfd], [], [], 1)
+    finally:
+        os.close(pidfd)
+
+def cleanup_existing_mock_servers():
+    """Kill the Mock Kit Server a previous run recorded in the pidfile"""
+    # Only the recorded server, and only if its PID was not recycled; servers
+    # started by hand are left alone
+    try:
+        with open(MOCK_SERVER_PIDFILE) as f:
+            pid = int(f.read())
+        if _is_mock_server(pid):
+            _kill_and_wait(pid)
+    except (OSError, ValueError):
+        pass
+    try:
+        os.remove(MOCK_SERVER_PIDFILE)
+    except OSError:
+        pass
+
+def cleanup_process(process, name):
+    """Clean up background process"""
+    try:
+        if process.poll() is None:  # Process is still running
+            print(f"🛑 Stopping {name}...")
+            process.send_signal(signal.SIGTERM)
+            # Wait on a pidfd so we return as soon as the child exits. The
+            # agent gives its apps up to 5s to stop on SIGTERM, so allow 6s
+            # before escalating to SIGKILL
+            pidfd = os.pidfd_open(process.pid)
+            try:
+                exited, _, _ = select.select([pidfd], [], [], 6)
+            finally:
+                os.close(pidfd)
+            if not exited:
+                process.kill()
+            process.wait()
+    except:
+        try:
+            process.kill()
+        except:
+            pass
+
+def check_mock_server_running():
+    """Check if mock Kit Server is running on port 3091"""
+    try:
+        # Short timeout so a missing server is reported quickly
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(0.25)
+        result = sock.connect_ex(('127.0.0.1', 3091))
+        sock.close()
+        return result == 0
+    except:
+        return False
+
+def start_mock_server(timeout=10):
+    """Start the Mock Kit Server and wait until it accepts connections; None on failure"""
+    print("🚀 Starting Mock Kit Server automatically...")
+
+    # Cleanup the Mock Kit Server a previous run left behind
+    cleanup_existing_mock_servers()
+
+    mock_server_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools', 'mock_kit_server.py')
+
+    try:
+        # Start mock server in background
+        process = subprocess.Popen([
+            sys.executable, mock_server_path
+        ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        drain_output(process, "Mock Kit Server")
+        record_mock_server(process)
+
+        # Register cleanup function
+        atexit.register(cleanup_process, process, "Mock Kit Server")
+
+        print(f"⏳ Waiting for Mock Kit Server to start (PID: {process.pid})...")
+
+        # Probe with exponential backoff (20ms growing to 500ms) so a fast
+        # start isn't padded out
+        delay = 0.02
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if check_mock_server_running():
+                print(f"✅ Mock Kit Server started successfully!")
+                return process
+            time.sleep(delay)
+            delay = min(delay * 1.5, 0.5)
+
+        print(f"❌ Mock Kit Server failed to start within {timeout} seconds")
+        print_output_tail("Mock Kit Server")
+        cleanup_process(process, "Mock Kit Server")
+        return None
+
+    except Exception as e:
+        print(f"❌ Failed to start Mock Kit Server: {e}")
+        return None
+
+def start_uda_agent(server_url="http://localhost:3091", timeout=10):
+    """Start the UDA Agent and wait until it registered with the Kit Server; None on failure"""
+    print("🚀 Starting UDA Agent with mock server...")
+
+    # UDA agent root; the agent resolves ./deployments and ./logs against its cwd
+    uda_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    try:
+        # Start UDA agent in background pointing to the Kit Server
+        uda_agent_path = os.path.join(uda_dir, 'src', 'uda_agent.py')
+        process = subprocess.Popen([
+            sys.executable, uda_agent_path, '--server', server_url
+        ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=uda_dir)
+        drain_output(process, "UDA Agent", ready_marker=UDA_REGISTERED_MARKER)
+
+        # Register cleanup function
+        atexit.register(cleanup_process, process, "UDA Agent")
+
+        print(f"⏳ Waiting for UDA Agent to start (PID: {process.pid})...")
+
+        # The drain thread also wakes us early if the agent exits
+        if wait_until_ready("UDA Agent", timeout) and process.poll() is None:
+            print(f"✅ UDA Agent started successfully!")
+            return process
+
+        print(f"❌ UDA Agent failed to start within {timeout} seconds")
+        print_output_tail("UDA Agent")
+        cleanup_process(process, "UDA Agent")
+        return None
+
+    except Exception as e:
+        print(f"❌ Failed to start UDA Agent: {e}")
+        return None
 
 class MockKitServerManager:
     """Manages Mock Kit Server lifecycle for tests"""
@@ -35,60 +261,30 @@ class MockKitServerManager:
             print("✅ Mock Kit Server is already running")
             return True
 
-        print("🚀 Starting Mock Kit Server...")
-
-        # Get absolute path to mock server
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        mock_server_path = os.path.join(current_dir, 'tools', 'mock_kit_server.py')
-
-        try:
-            # Start mock server in background
-            self.process = subprocess.Popen([
-                sys.executable, mock_server_path
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-            print(f"⏳ Waiting for Mock Kit Server to start (PID: {self.process.pid})...")
-
-            # Wait for server to start
-            for i in range(timeout):
-                if self.is_running():
-                    print(f"✅ Mock Kit Server started successfully!")
-
-                    # Register cleanup function
-                    atexit.register(self.stop)
-                    return True
-
-                time.sleep(1)
-                if (i + 1) % 3 == 0:
-                    print(f"   Waiting... {i+1}/{timeout}")
-
-            print("❌ Mock Kit Server failed to start")
-            self.stop()
+        self.process = start_mock_server(timeout)
+        if self.process is None:
             return False
 
-        except Exception as e:
-            print(f"❌ Failed to start Mock Kit Server: {e}")
-            return False
+        # Register cleanup function
+        atexit.register(self.stop)
+        return True
 
     def stop(self):
         """Stop Mock Kit Server"""
+        owned = self.process is not None
         if self.process:
-            try:
-                print("🛑 Stopping Mock Kit Server...")
-                self.process.terminate()
-                self.process.wait(timeout=5)
-                print("✅ Mock Kit Server stopped")
-            except subprocess.TimeoutExpired:
-                print("⚠️  Force killing Mock Kit Server...")
-                self.process.kill()
-                self.process.wait()
-            except Exception as e:
-                print(f"⚠️  Error stopping Mock Kit Server: {e}")
-            finally:
-                self.process = None
+            cleanup_process(self.process, "Mock Kit Server")
+            self.process = None
 
-        # Also kill any remaining processes using the port
+        # We stopped the exact process we started; no need to scan every
+        # process's sockets for the port
+        if owned:
+            return
+
+        # Not started by us - kill any remaining processes using the port.
+        # psutil is only needed here, so it is imported on first use
         try:
+            import psutil
             for proc in psutil.process_iter(['pid', 'name', 'connections']):
                 try:
                     for conn in proc.info['connections'] or []:
@@ -124,56 +320,19 @@ class UDAgentManager:
             print("✅ UDA Agent is already running")
             return True
 
-        print("🚀 Starting UDA Agent...")
-
-        # Change to the UDA directory (parent of tests)
-        uda_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-        try:
-            # Start UDA agent in background pointing to mock server
-            self.process = subprocess.Popen([
-                sys.executable, 'src/uda_agent.py', '--server', self.server_url
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=uda_dir)
-
-            print(f"⏳ Waiting for UDA Agent to start (PID: {self.process.pid})...")
-
-            # Wait for agent to start
-            for i in range(timeout):
-                if self.is_running():
-                    print(f"✅ UDA Agent started successfully!")
-
-                    # Register cleanup function
-                    atexit.register(self.stop)
-                    return True
-
-                time.sleep(1)
-                if (i + 1) % 3 == 0:
-                    print(f"   Waiting... {i+1}/{timeout}")
-
-            print("❌ UDA Agent failed to start within timeout")
-            self.stop()
+        self.process = start_uda_agent(self.server_url, timeout)
+        if self.process is None:
             return False
 
-        except Exception as e:
-            print(f"❌ Failed to start UDA Agent: {e}")
-            return False
+        # Register cleanup function
+        atexit.register(self.stop)
+        return True
 
     def stop(self):
         """Stop UDA Agent"""
         if self.process:
-            try:
-                print("🛑 Stopping UDA Agent...")
-                self.process.terminate()
-                self.process.wait(timeout=5)
-                print("✅ UDA Agent stopped")
-            except subprocess.TimeoutExpired:
-                print("⚠️  Force killing UDA Agent...")
-                self.process.kill()
-                self.process.wait()
-            except Exception as e:
-                print(f"⚠️  Error stopping UDA Agent: {e}")
-            finally:
-                self.process = None
+            cleanup_process(self.process, "UDA Agent")
+            self.process = None
 
 def ensure_mock_server_running():
     """Ensure Mock Kit Server is running - global precondition function"""
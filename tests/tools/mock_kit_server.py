@@ -3,24 +3,71 @@
 Mock Kit Server for testing UDA agent
 """
 
+import asyncio
+import logging
+import os
 import socketio
-import threading
-import time
+import sys
 import json
 from datetime import datetime
+from aiohttp import web
+
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+# orjson is optional; it speeds up Socket.IO packet encoding and the debug dumps
+try:
+    import orjson
+
+    def dumps_pretty(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+
+    class sio_json:
+        """json-module shim handed to socketio; orjson output is always compact"""
+
+        @staticmethod
+        def dumps(obj, **kwargs):
+            return orjson.dumps(obj).decode()
+
+        @staticmethod
+        def loads(s, **kwargs):
+            return orjson.loads(s)
+except ImportError:
+    def dumps_pretty(obj):
+        return json.dumps(obj, indent=2)
+
+    sio_json = json
+
+# SIO_DEBUG=1 turns on Socket.IO/Engine.IO packet logging and per-message payload dumps
+SIO_DEBUG = os.getenv('SIO_DEBUG') == '1'
+
+logger = logging.getLogger(__name__)
 
 class MockKitServer:
     def __init__(self, port=3091):  # Use different port to avoid conflict
         self.port = port
-        self.sio = socketio.Server(cors_allowed_origins="*")
+        self.sio = socketio.AsyncServer(async_mode='aiohttp', cors_allowed_origins="*",
+                                        logger=SIO_DEBUG, engineio_logger=SIO_DEBUG,
+                                        json=sio_json)
         self.connected_clients = {}
         self.registered_kits = {}
+        # Reverse index of registered_kits: socket id -> ids of the kits
+        # registered over it, as a dict used as an insertion-ordered set
+        self._sid_to_kits = {}
+        # Strong references to emits still in flight (see _emit_nowait)
+        self._pending_emits = set()
+        # How long a forwarded request may wait for the kit's final reply
+        # before the ack to the requesting client is given up
+        self.ack_timeout = 30
 
     def setup_events(self):
         """Setup Socket.IO event handlers"""
 
         @self.sio.event
-        def connect(sid, environ):
+        async def connect(sid, environ):
             print(f"🔌 Client connected: {sid}")
             self.connected_clients[sid] = {
                 'connected_at': datetime.now().isoformat(),
@@ -28,19 +75,19 @@ class MockKitServer:
             }
 
         @self.sio.event
-        def disconnect(sid):
+        async def disconnect(sid):
             print(f"❌ Client disconnected: {sid}")
             if sid in self.connected_clients:
                 del self.connected_clients[sid]
 
-            # Remove from registered kits if it was a kit
-            for kit_id, kit_info in list(self.registered_kits.items()):
-                if kit_info.get('socket_id') == sid:
-                    kit_info['is_online'] = False
-                    print(f"📡 Kit went offline: {kit_id}")
+            # Mark every kit on this socket offline
+            for kit_id, kit_info in self._kits_for_sid(sid):
+                kit_info['is_online'] = False
+                print(f"📡 Kit went offline: {kit_id}")
+            self._sid_to_kits.pop(sid, None)
 
         @self.sio.event
-        def register_kit(sid, data):
+        async def register_kit(sid, data):
             """Handle kit registration"""
             kit_id = data.get('kit_id')
             name = data.get('name')
@@ -62,16 +109,17 @@ class MockKitServer:
                 'version': data.get('version', '1.0.0'),
                 'desc': data.get('desc', '')
             }
+            self._sid_to_kits.setdefault(sid, {})[kit_id] = None
 
             # Send acknowledgment
-            self.sio.emit('register_kit_ack', {
+            await self.sio.emit('register_kit_ack', {
                 'kit_id': kit_id,
                 'status': 'registered',
                 'message': f'Kit {kit_id} registered successfully'
             }, room=sid)
 
         @self.sio.event
-        def messageToKit(sid, data):
+        async def messageToKit(sid, data):
             """Handle messageToKit - route requests and responses"""
             cmd = data.get('cmd', '')
             target_kit_id = data.get('to_kit_id', '')
@@ -82,56 +130,62 @@ class MockKitServer:
 
             if is_response:
                 # This is a response from UDA agent - route it back to the original test client
-                print(f"📨 Received response '{cmd}' from UDA agent")
+                logger.info("📨 Received response '%s' from UDA agent", cmd)
 
                 # Find which kit sent this response
-                kit_id = None
-                kit_info = None
-                for kid, info in self.registered_kits.items():
-                    if info['socket_id'] == sid:
-                        kit_id = kid
-                        kit_info = info
-                        break
+                kit_id, kit_info = self._kit_for_sid(sid)
 
                 if kit_id and kit_info and 'active_request' in kit_info:
                     original_sid = kit_info['active_request']['original_sid']
                     original_cmd = kit_info['active_request']['cmd']
 
                     if cmd == original_cmd:
-                        print(f"🎯 Routing response from UDA agent '{kit_id}' back to test client (sid: {original_sid})")
-                        print(f"📦 Response: {json.dumps(data, indent=2)}")
+                        logger.info("🎯 Routing response from UDA agent '%s' back to test client (sid: %s)", kit_id, original_sid)
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("📦 Response: %s", dumps_pretty(data))
 
                         # Send response back to original test client
-                        self.sio.emit('messageToKit', data, room=original_sid)
+                        self._emit_nowait('messageToKit', data, room=original_sid)
 
-                        # Clear active request
-                        del kit_info['active_request']
+                        # Clear active request and release any pending ack
+                        self._resolve_request(kit_info.pop('active_request'), data)
                     else:
-                        print(f"⚠️ Response command mismatch: expected {original_cmd}, got {cmd}")
+                        logger.warning("⚠️ Response command mismatch: expected %s, got %s", original_cmd, cmd)
                 else:
-                    print(f"⚠️ Received response but no active request found for kit {kit_id}")
+                    logger.warning("⚠️ Received response but no active request found for kit %s", kit_id)
             else:
                 # This is a request from test client - forward it to UDA agent
-                print(f"📨 Received request '{cmd}' for kit '{target_kit_id}' from {request_from}")
+                logger.info("📨 Received request '%s' for kit '%s' from %s", cmd, target_kit_id, request_from)
 
                 # Find the target kit
                 if target_kit_id in self.registered_kits:
                     kit_info = self.registered_kits[target_kit_id]
                     target_sid = kit_info['socket_id']
 
-                    print(f"🎯 Forwarding request to kit: {target_kit_id} (sid: {target_sid})")
-
-                    # Forward the message to the target kit
-                    self.sio.emit('messageToKit', data, room=target_sid)
+                    logger.info("🎯 Forwarding request to kit: %s (sid: %s)", target_kit_id, target_sid)
 
-                    # Store request info for routing response back
-                    kit_info['active_request'] = {
+                    # Store request info for routing response back before
+                    # forwarding, so a fast reply can't beat us to it
+                    request = {
                         'request_from': request_from,
                         'cmd': cmd,
-                        'original_sid': sid
+                        'original_sid': sid,
+                        'reply': None,
+                        'reply_event': asyncio.Event()
                     }
+                    kit_info['active_request'] = request
+
+                    # Forward the message to the target kit
+                    await self.sio.emit('messageToKit', data, room=target_sid)
+
+                    # The return value is the ack for clients using sio.call()
+                    try:
+                        await asyncio.wait_for(request['reply_event'].wait(), timeout=self.ack_timeout)
+                        return request['reply']
+                    except asyncio.TimeoutError:
+                        logger.warning("⚠️ No final reply from kit %s within %ss", target_kit_id, self.ack_timeout)
                 else:
-                    print(f"❌ Kit not found: {target_kit_id}")
+                    logger.error("❌ Kit not found: %s", target_kit_id)
                     # Send error response back to requester
                     error_response = {
                         'request_from': request_from,
@@ -141,10 +195,11 @@ class MockKitServer:
                         'code': 1,
                         'isDone': True
                     }
-                    self.sio.emit('messageToKit', error_response, room=sid)
+                    await self.sio.emit('messageToKit', error_response, room=sid)
+                    return error_response
 
-        @self.sio.event
-        def messageToKit_kitReply(sid, data):
+        @self.sio.on('messageToKit-kitReply')
+        async def messageToKit_kitReply(sid, data):
             """Handle messageToKit-kitReply - route UDA agent SDV-runtime responses back to test clients"""
             cmd = data.get('cmd', '')
             request_from = data.get('request_from', 'unknown')
@@ -153,67 +208,110 @@ class MockKitServer:
             is_done = data.get('isDone', True)
             code = data.get('code', 0)
 
-            print(f"📨 Received SDV runtime response '{cmd}' (kit: {kit_id[:15]}...)")
-            print(f"   Request from: {request_from}")
-            print(f"   Is Done: {is_done}, Code: {code}")
+            logger.info("📨 Received SDV runtime response '%s' (kit: %.15s...)\n   Request from: %s\n   Is Done: %s, Code: %s",
+                        cmd, kit_id, request_from, is_done, code)
 
             # Find which kit sent this response
-            kit_info = None
-            for kid, info in self.registered_kits.items():
-                if info['socket_id'] == sid:
-                    kit_info = info
-                    break
+            _, kit_info = self._kit_for_sid(sid)
 
             if kit_info and 'active_request' in kit_info:
                 # Route response back to original test client
                 original_request = kit_info['active_request']
                 test_client_sid = original_request['original_sid']
 
-                print(f"🎯 Routing response back to test client: {test_client_sid}")
-                self.sio.emit('messageToKit-kitReply', data, room=test_client_sid)
+                logger.info("🎯 Routing response back to test client: %s", test_client_sid)
+                self._emit_nowait('messageToKit-kitReply', data, room=test_client_sid)
 
                 # Clear active request if this is the final response
                 if is_done:
-                    kit_info.pop('active_request', None)
+                    self._resolve_request(kit_info.pop('active_request'), data)
             else:
-                print(f"⚠️ No active request found for kit {kit_id}, broadcasting to all clients")
-                self.sio.emit('messageToKit-kitReply', data)
+                logger.warning("⚠️ No active request found for kit %s, broadcasting to all clients", kit_id)
+                self._emit_nowait('messageToKit-kitReply', data)
 
         @self.sio.on('*')
-        def catch_all(event, sid, data):
+        async def catch_all(event, sid, data):
             """Log all events for debugging"""
             if event not in ['connect', 'disconnect', 'messageToKit', 'messageToKit-kitReply', 'register_kit']:
-                print(f"📨 Received event '{event}' from {sid}")
-                if isinstance(data, dict) and len(str(data)) < 300:
-                    print(f"📦 Data: {json.dumps(data, indent=2)}")
+                logger.info("📨 Received event '%s' from %s", event, sid)
+                if (logger.isEnabledFor(logging.DEBUG)
+                        and isinstance(data, dict) and len(str(data)) < 300):
+                    logger.debug("📦 Data: %s", dumps_pretty(data))
 
-    def start_server(self):
-        """Start the mock Kit Server"""
+    def _raise_fd_limit(self):
+        """Lift the open-file soft limit towards the hard limit, so many test clients can connect"""
+        try:
+            import resource
+            soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+            target = 65536 if hard == resource.RLIM_INFINITY else min(hard, 65536)
+            if soft != resource.RLIM_INFINITY and soft < target:
+                resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        except (ImportError, ValueError, OSError) as e:
+            print(f"⚠️ Could not raise open file limit: {e}")
+
+    def _emit_nowait(self, event, data, room=None):
+        """Schedule an emit and return without waiting for it to be queued.
+
+        Tasks start in creation order and emit() queues the packet before its
+        first suspension point, so replies to one client keep their order.
+        """
+        task = asyncio.ensure_future(self.sio.emit(event, data, room=room))
+        self._pending_emits.add(task)
+        task.add_done_callback(self._pending_emits.discard)
+
+    def _kits_for_sid(self, sid):
+        """Return [(kit_id, kit_info)] for the kits currently on this socket, in registration order"""
+        kits = []
+        for kit_id in self._sid_to_kits.get(sid, ()):
+            kit_info = self.registered_kits.get(kit_id)
+            # A kit that re-registered on a new socket no longer belongs to this one
+            if kit_info is not None and kit_info['socket_id'] == sid:
+                kits.append((kit_id, kit_info))
+        return kits
+
+    def _kit_for_sid(self, sid):
+        """Return (kit_id, kit_info) for the first kit on this socket, or (None, None)"""
+        kits = self._kits_for_sid(sid)
+        return kits[0] if kits else (None, None)
+
+    def _resolve_request(self, request, reply):
+        """Hand the final reply to a request still waiting on its ack"""
+        request['reply'] = reply
+        request['reply_event'].set()
+
+    async def start_server(self):
+        """Start the mock Kit Server and serve until cancelled"""
         self.setup_events()
+        self._raise_fd_limit()
 
         print(f"🚀 Starting Mock Kit Server on port {self.port}")
         print(f"📡 Server will be available at: http://localhost:{self.port}")
         print("=" * 50)
 
-        # Create a simple WSGI application
-        def simple_wsgi_app(environ, start_response):
-            """Simple WSGI app that returns 404 for HTTP requests"""
-            start_response('404 Not Found', [('Content-Type', 'text/plain')])
-            return [b'Not Found - This is a Socket.IO server only']
-
-        # Wrap with Socket.IO WSGI app
-        app = socketio.WSGIApp(self.sio, simple_wsgi_app)
+        # Socket.IO on an aiohttp app; other HTTP paths get aiohttp's 404
+        app = web.Application()
+        self.sio.attach(app)
 
-        # Try to start server with eventlet first, fallback to wsgiref
+        runner = web.AppRunner(app)
+        await runner.setup()
         try:
-            import eventlet
-            eventlet.wsgi.server(eventlet.listen(('', self.port)), app)
-        except ImportError:
-            print("⚠️ eventlet not available, using wsgiref (less performant)")
-            from wsgiref.simple_server import make_server
-            httpd = make_server('', self.port, app)
-            print(f"🌐 Starting server with wsgiref on port {self.port}")
-            httpd.serve_forever()
+            await web.TCPSite(runner, '', self.port).start()
+            print(f"✅ Listening on port {self.port}", flush=True)
+
+            # Periodic status output runs on the event loop, not in a thread
+            status_task = asyncio.ensure_future(self.status_monitor())
+            try:
+                await asyncio.Event().wait()
+            finally:
+                status_task.cancel()
+        finally:
+            await runner.cleanup()
+
+    async def status_monitor(self, interval=10):
+        """Print server status every `interval` seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            self.print_status()
 
     def copy_events_to_flask_socketio(self, sio_app):
         """Copy event handlers to Flask-SocketIO app"""
@@ -298,7 +396,7 @@ class MockKitServer:
 
                     if cmd == original_cmd:
                         print(f"🎯 Routing response from UDA agent '{kit_id}' back to test client (sid: {original_sid})")
-                        print(f"📦 Response: {json.dumps(data, indent=2)}")
+                        print(f"📦 Response: {dumps_pretty(data)}")
 
                         # Send response back to original test client
                         sio_app.emit('messageToKit', data, room=original_sid)
@@ -384,7 +482,7 @@ class MockKitServer:
             if event not in ['connect', 'disconnect', 'messageToKit', 'messageToKit-kitReply', 'register_kit']:
                 print(f"📨 Received event '{event}' from {sid}")
                 if isinstance(data, dict) and len(str(data)) < 300:
-                    print(f"📦 Data: {json.dumps(data, indent=2)}")
+                    print(f"📦 Data: {dumps_pretty(data)}")
 
     def print_status(self):
         """Print current server status"""
@@ -401,28 +499,22 @@ class MockKitServer:
                 if kit_info['capabilities']:
                     print(f"     Capabilities: {', '.join(kit_info['capabilities'])}")
 
-def main():
+async def main():
     """Main function to run the mock server"""
     server = MockKitServer(port=3091)
+    await server.start_server()
 
-    # Start status monitoring thread
-    def status_monitor():
-        while True:
-            time.sleep(10)
-            server.print_status()
+if __name__ == "__main__":
+    # Per-message routing goes through logging on stdout, alongside the prints
+    logging.basicConfig(level=logging.DEBUG if SIO_DEBUG else logging.INFO,
+                        format='%(message)s', stream=sys.stdout)
 
-    status_thread = threading.Thread(target=status_monitor, daemon=True)
-    status_thread.start()
+    print("🧪 Mock Kit Server for UDA Agent Testing")
+    print("=" * 50)
 
     try:
-        server.start_server()
+        asyncio.run(main())
     except KeyboardInterrupt:
         print("\n🛑 Mock Kit Server stopped by user")
     except Exception as e:
         print(f"❌ Mock Kit Server error: {e}")
-
-if __name__ == "__main__":
-    print("🧪 Mock Kit Server for UDA Agent Testing")
-    print("=" * 50)
-
-    main()
\ No newline at end of file
@@ -9,6 +9,16 @@ import time
 import json
 from datetime import datetime
 
+# orjson is optional; it only speeds up the pretty-printed debug dumps
+try:
+    import orjson
+
+    def dumps_pretty(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def dumps_pretty(obj):
+        return json.dumps(obj, indent=2)
+
 sio = socketio.Server(cors_allowed_origins="*", logger=False, engineio_logger=False)
 
 # Storage
@@ -100,7 +110,7 @@ def messageToKit(sid, data):
 
             if cmd == original_cmd:
                 print(f"🎯 Routing response from UDA agent '{kit_id}' back to test client")
-                print(f"📦 Response: {json.dumps(data, indent=2)}")
+                print(f"📦 Response: {dumps_pretty(data)}")
 
                 # Send response back to original test client
                 sio.emit('messageToKit', data, room=original_sid)
@@ -187,7 +197,7 @@ def catch_all(event, sid, data):
     if event not in ['connect', 'disconnect', 'messageToKit', 'messageToKit-kitReply', 'register_kit']:
         print(f"📨 Received event '{event}' from {sid}")
         if isinstance(data, dict) and len(str(data)) < 300:
-            print(f"📦 Data: {json.dumps(data, indent=2)}")
+            print(f"📦 Data: {dumps_pretty(data)}")
 
 def status_monitor():
     """Print status every 15 seconds"""
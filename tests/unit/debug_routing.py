@@ -9,7 +9,10 @@ import json
 import subprocess
 import sys
 import os
-import threading
+
+# Add parent directory to path for test_helpers
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from test_helpers import record_mock_server, drain_output
 
 def debug_mock_server():
     """Debug Mock Kit Server events directly"""
@@ -74,16 +77,11 @@ def start_mock_debug():
     mock_server_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools', 'mock_kit_server.py')
     process = subprocess.Popen([
         sys.executable, mock_server_path
-    ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-       universal_newlines=True, bufsize=1)
-
-    def output_reader():
-        for line in iter(process.stdout.readline, ''):
-            print(f"[MOCK] {line.strip()}")
+    ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    record_mock_server(process)
 
-    # Start output reader thread
-    reader_thread = threading.Thread(target=output_reader, daemon=True)
-    reader_thread.start()
+    # Echo the server's output as it arrives
+    drain_output(process, 'MOCK', echo=True)
 
     # Wait for server to start
     time.sleep(3)
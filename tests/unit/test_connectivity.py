@@ -4,14 +4,20 @@ Simple connectivity test for UDA agent with automatic service startup
 """
 
 import socket
-import requests
+import urllib.error
+import urllib.request
 import subprocess
 import sys
 import time
 import os
-import signal
 import atexit
 
+# Add parent directory to path for test_helpers
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from test_helpers import (cleanup_process, drain_output, print_output_tail,
+                          check_uda_agent_running, wait_until_ready,
+                          UDA_REGISTERED_MARKER, record_mock_server)
+
 def test_connectivity():
     """Test if UDA agent is running and accessible"""
     print("🔍 Testing UDA Agent Connectivity")
@@ -19,10 +25,14 @@ def test_connectivity():
 
     # Test if we can reach Kit Server
     try:
-        response = requests.get('https://kit.digitalauto.tech', timeout=5)
-        print(f"✅ Kit Server reachable (status: {response.status_code})")
+        with urllib.request.urlopen('https://kit.digitalauto.tech', timeout=5) as response:
+            print(f"✅ Kit Server reachable (status: {response.status})")
+        return True
+    except urllib.error.HTTPError as e:
+        # Got an HTTP answer, so the server is reachable
+        print(f"✅ Kit Server reachable (status: {e.code})")
         return True
-    except requests.exceptions.ConnectionError:
+    except urllib.error.URLError:
         print("❌ Kit Server not reachable")
         print("💡 This is normal for local testing - use mock server instead")
         return False
@@ -51,16 +61,6 @@ def test_port_open():
         print(f"❌ Port test error: {e}")
         return False
 
-def check_uda_agent_running():
-    """Check if UDA agent is already running"""
-    try:
-        # Check for UDA agent process
-        result = subprocess.run(['pgrep', '-f', 'uda_agent.py'],
-                              capture_output=True, text=True)
-        return result.returncode == 0
-    except:
-        return False
-
 def start_mock_server():
     """Start Mock Kit Server for connectivity test"""
     print("🚀 Starting Mock Kit Server for connectivity test...")
@@ -71,7 +71,9 @@ def start_mock_server():
     try:
         process = subprocess.Popen([
             sys.executable, mock_server_path
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        drain_output(process, "Mock Kit Server")
+        record_mock_server(process)
 
         # Wait for server to start
         time.sleep(3)
@@ -81,6 +83,7 @@ def start_mock_server():
             return process
         else:
             print("❌ Mock Kit Server failed to start")
+            print_output_tail("Mock Kit Server")
             return None
     except Exception as e:
         print(f"❌ Failed to start Mock Kit Server: {e}")
@@ -90,53 +93,37 @@ def start_uda_agent():
     """Start the UDA agent automatically"""
     print("🚀 Starting UDA Agent automatically...")
 
-    # Change to the correct directory
+    # UDA agent root; the agent resolves ./deployments and ./logs against its cwd
     uda_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    os.chdir(uda_dir)
 
     try:
         # Start UDA agent in background with Mock Kit Server
         uda_agent_path = os.path.join(uda_dir, 'src', 'uda_agent.py')
         process = subprocess.Popen([
             sys.executable, uda_agent_path, '--server', 'http://localhost:3091'
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=uda_dir)
+        drain_output(process, "UDA Agent", ready_marker=UDA_REGISTERED_MARKER)
 
         # Register cleanup function
-        atexit.register(lambda: cleanup_process(process))
+        atexit.register(lambda: cleanup_process(process, "UDA Agent"))
 
         print(f"⏳ Waiting for UDA agent to start (PID: {process.pid})...")
 
-        # Wait up to 15 seconds for agent to start
-        for i in range(15):
-            if check_uda_agent_running():
-                print(f"✅ UDA agent started successfully!")
-                return True
-            time.sleep(1)
-            # Only show progress every 3 seconds
-            if (i + 1) % 3 == 0:
-                print(f"   Waiting... {i+1}/15")
+        # Wait up to 15 seconds for the agent to register with the Kit
+        # Server; the drain thread also wakes us early if the agent exits
+        if wait_until_ready("UDA Agent", timeout=15) and process.poll() is None:
+            print(f"✅ UDA agent started successfully!")
+            return True
 
         print("❌ UDA agent failed to start within 15 seconds")
-        cleanup_process(process)
+        print_output_tail("UDA Agent")
+        cleanup_process(process, "UDA Agent")
         return False
 
     except Exception as e:
         print(f"❌ Failed to start UDA agent: {e}")
         return False
 
-def cleanup_process(process):
-    """Clean up background process"""
-    try:
-        if process.poll() is None:  # Process is still running
-            print("🛑 Stopping UDA agent...")
-            process.terminate()
-            process.wait(timeout=5)
-    except:
-        try:
-            process.kill()
-        except:
-            pass
-
 if __name__ == "__main__":
     print("🧪 UDA Agent Connectivity Test with Auto-Start")
     print("=" * 60)
@@ -148,7 +135,7 @@ if __name__ == "__main__":
         sys.exit(1)
 
     # Check if agent is already running
-    if check_uda_agent_running():
+    if check_uda_agent_running(server=None):
         print("✅ UDA agent is already running!")
     else:
         print("🔍 UDA agent is not running, starting it automatically...")